@@ -0,0 +1,115 @@
+# analytics.py
+from datetime import date, timedelta
+import numpy as np
+from clock import clock
+from models import Habit
+
+WEEKDAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+
+class HabitAnalytics:
+    """
+    Статистика сразу по всем привычкам на выровненной матрице «день × привычка».
+
+    Строка i матрицы соответствует дню start + i, столбец j — привычке habits[j].
+    Результаты методов — массивы NumPy в том же порядке привычек. День считается
+    выполненным так же, как в Habit.is_completed_on: прогресс >= цели.
+    """
+
+    def __init__(self, habits: list[Habit], end: date = None, start: date = None):
+        self.habits = list(habits)
+        self.end = end or clock.today()
+        if start is None:
+            first_days = [d for d in (h.first_logged_day() for h in self.habits) if d]
+            start = min(first_days) if first_days else self.end
+        self.start = min(start, self.end)
+        self.days = (self.end - self.start).days + 1
+
+        self.goals = np.array([h.goal for h in self.habits], dtype=float)
+        self.values = np.zeros((self.days, len(self.habits)))
+        for j, habit in enumerate(self.habits):
+            self.values[:, j] = np.frombuffer(habit.progress_between(self.start, self.end), dtype=float)
+        np.nan_to_num(self.values, copy=False, nan=0.0)
+        self.completed = self.values >= self.goals
+        self._runs = None
+
+    def dates(self) -> list[date]:
+        return [self.start + timedelta(days=i) for i in range(self.days)]
+
+    def by_habit(self, column_values) -> dict:
+        """Раскладывает значения по столбцам в словарь {id привычки: значение}."""
+        return {habit.id: value for habit, value in zip(self.habits, column_values)}
+
+    @property
+    def streak_runs(self) -> np.ndarray:
+        """Длина серии выполненных дней, заканчивающейся в каждый день (0, если день не выполнен)."""
+        if self._runs is None:
+            total = np.cumsum(self.completed, axis=0)
+            # На невыполненных днях запоминаем накопленную сумму и вычитаем её из последующих
+            reset = np.maximum.accumulate(np.where(self.completed, 0, total), axis=0)
+            self._runs = total - reset
+        return self._runs
+
+    def current_streaks(self) -> np.ndarray:
+        """
+        Текущая серия на день end. Если сегодня цель ещё не выполнена,
+        считается серия, закончившаяся вчера.
+        """
+        runs = self.streak_runs
+        if self.days == 0 or not len(self.habits):
+            return np.zeros(len(self.habits), dtype=int)
+        yesterday = runs[-2] if self.days > 1 else np.zeros(len(self.habits), dtype=int)
+        return np.where(self.completed[-1], runs[-1], yesterday)
+
+    def longest_streaks(self) -> np.ndarray:
+        return self.streak_runs.max(axis=0, initial=0)
+
+    def completion_rates(self, period: str = "week") -> tuple[list[date], np.ndarray]:
+        """
+        Доля выполненных дней по периодам ("week", "month" или "year").
+        Возвращает даты начала периодов и матрицу «период × привычка».
+        """
+        ordinals = np.arange(self.start.toordinal(), self.end.toordinal() + 1)
+        if period == "week":
+            keys = ordinals - (ordinals - 1) % 7  # понедельник недели (toordinal(1.1.1) — понедельник)
+        else:
+            day_list = self.dates()
+            if period == "month":
+                keys = np.array([d.year * 12 + d.month - 1 for d in day_list])
+            elif period == "year":
+                keys = np.array([d.year for d in day_list])
+            else:
+                raise ValueError(f"Неизвестный период: {period}")
+        # Дни идут по порядку, поэтому каждый период — непрерывный блок строк
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        done = np.add.reduceat(self.completed.astype(float), starts, axis=0)
+        lengths = np.diff(np.r_[starts, self.days])
+        labels = [self.start + timedelta(days=int(i)) for i in starts]
+        if period == "month":
+            labels = [d.replace(day=1) for d in labels]
+        elif period == "year":
+            labels = [d.replace(month=1, day=1) for d in labels]
+        elif period == "week":
+            labels = [d - timedelta(days=d.weekday()) for d in labels]
+        return labels, done / lengths[:, None]
+
+    def rolling_average(self, window: int = 7) -> np.ndarray:
+        """Скользящее среднее прогресса за window дней; в начале — по имеющимся дням."""
+        totals = np.cumsum(np.vstack([np.zeros((1, len(self.habits))), self.values]), axis=0)
+        counts = np.minimum(np.arange(1, self.days + 1), window)
+        return (totals[1:] - totals[np.arange(1, self.days + 1) - counts]) / counts[:, None]
+
+    def weekday_rates(self) -> np.ndarray:
+        """Доля выполненных дней по дням недели: матрица 7 × привычка (строка 0 — понедельник)."""
+        weekdays = (np.arange(self.start.toordinal(), self.end.toordinal() + 1) - 1) % 7
+        done = np.zeros((7, len(self.habits)))
+        np.add.at(done, weekdays, self.completed)
+        counts = np.bincount(weekdays, minlength=7)[:, None]
+        return np.where(counts > 0, done / np.maximum(counts, 1), np.nan)
+
+    def best_weekdays(self) -> np.ndarray:
+        """Индекс дня недели (0 — понедельник) с наибольшей долей выполнения для каждой привычки."""
+        return np.argmax(np.nan_to_num(self.weekday_rates(), nan=-1.0), axis=0)
+
+    def worst_weekdays(self) -> np.ndarray:
+        return np.argmin(np.nan_to_num(self.weekday_rates(), nan=2.0), axis=0)
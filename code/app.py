@@ -1,71 +1,168 @@
 # app.py
 import customtkinter as ctk
-from models import Habit
+from collections import OrderedDict
+from clock import clock
+from models import Habit, DailySummary
 from data_manager import DataManager
-from pages import HabitListPage
-from settings import APP_NAME, WINDOW_SIZE
+from executor import executor
+from heatmap import heatmap_cache
+from icons import icon_cache
+from repository import HabitRepository
+from instrumentation import ENABLED as INSTRUMENTATION_ENABLED, install_widget_counters, traced, tracer
+from settings import APP_NAME, WINDOW_SIZE, TRACE_FILE, PAGE_CACHE_SIZE
 
 
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, profile=None):
+        """profile — StartupProfile из main.py при запуске с --profile-startup."""
+        self.profile = profile
+        install_widget_counters()
         super().__init__()
         self.title(APP_NAME)
         self.geometry(WINDOW_SIZE)
         ctk.set_appearance_mode("System")
         self.configure(fg_color=("gray92", "black"))
-
-        self.habits = DataManager.load_habits()
+        self.habits = HabitRepository()
+        self.habits.subscribe(self._on_habits_changed)
+        self.daily_summary = DailySummary()
+        clock.subscribe(self._on_day_changed)
+        clock.start(self)
+        executor.attach(self)
 
         # --- Система навигации ---
         self.container = ctk.CTkFrame(self, fg_color="transparent")
         self.container.pack(fill="both", expand=True)
-        self.page_stack = []
+        self.page_stack = []  # (класс, параметры) страниц, на которые можно вернуться
         self.current_page = None
-
+        self._current_kwargs = {}
+        self._page_cache = OrderedDict()  # класс -> скрытая страница, от давно показанной к недавней
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # Окно с заголовком показывается сразу, а привычки и иконки загружаются в фоне
+        self.loading_frame = ctk.CTkFrame(self.container, fg_color="transparent")
+        self.loading_frame.pack(fill="both", expand=True)
+        ctk.CTkLabel(self.loading_frame, text="Привычки", font=("SF Pro Display", 34, "bold")).pack(anchor="w", padx=20, pady=(20, 10))
+        ctk.CTkLabel(self.loading_frame, text="Загрузка…", text_color="gray").pack(expand=True)
+        self.update_idletasks()
+        self._mark("первый кадр")
+
+        executor.submit(self._load_data, on_done=self._finish_loading, on_error=self._on_load_error)
+
+    def _mark(self, phase: str):
+        if self.profile: self.profile.mark(phase)
+
+    @staticmethod
+    def _load_data() -> list[Habit]:
+        """
+        Фоновая часть запуска: чтение данных и декодирование иконок, нужных
+        первому экрану. Остальные иконки загрузятся при первом обращении. Виджеты здесь не создаются.
+        """
+        habits = DataManager.load_habits()
+        icon_cache.preload({habit.icon for habit in habits}, size=(28, 28))
+        icon_cache.preload(["settings.png"])
+        return habits
+
+    def _on_load_error(self, error: Exception):
+        print(f"Критическая ошибка: Не удалось загрузить данные. Причина: {error}")
+        self._finish_loading([])
+
+    def _finish_loading(self, habits: list[Habit]):
+        """Вызывается в потоке интерфейса, когда фоновая загрузка закончилась; строит список."""
+        self._mark("данные загружены")
+        from pages import HabitListPage  # страницы импортируются после показа окна
+        self.habits.replace_all(habits)
+        self.loading_frame.destroy()
         self.navigate_to(HabitListPage)
-
+        if INSTRUMENTATION_ENABLED:
+            from pages import TraceOverlay
+            TraceOverlay(self)
+        self.update_idletasks()
+        self._mark("список привычек показан")
+        if self.profile: self.profile.report()
+
+    def _on_close(self):
+        clock.stop()
+        DataManager.flush()
+        executor.shutdown()
+        if INSTRUMENTATION_ENABLED:
+            tracer.export(TRACE_FILE)
+        self.destroy()
+
+    @traced("App.navigate_to")
     def navigate_to(self, PageClass, **kwargs):
-        new_page = PageClass(self.container, self, **kwargs)
-
         if self.current_page:
-            self.current_page.destroy()
-            self.page_stack.append(PageClass)
-
-        self.current_page = new_page
-        self.current_page.pack(fill="both", expand=True)
+            self.page_stack.append((type(self.current_page), self._current_kwargs))
+        self._show_page(PageClass, kwargs)
 
+    @traced("App.navigate_back")
     def navigate_back(self):
         if not self.page_stack: return
+        PreviousPageClass, kwargs = self.page_stack.pop()
+        self._show_page(PreviousPageClass, kwargs)
+
+    def _show_page(self, PageClass, kwargs: dict):
+        """Показывает страницу: берёт её из кэша, если можно, иначе создаёт заново."""
+        new_page = self._page_cache.pop(PageClass, None) if PageClass.cacheable and not kwargs else None
+        if new_page is None:
+            new_page = PageClass(self.container, self, **kwargs)
+        if self.current_page:
+            self._hide_page(self.current_page)
+        self.current_page, self._current_kwargs = new_page, kwargs
+        self.current_page.pack(fill="both", expand=True)
+        new_page.on_show()
+
+    def _hide_page(self, page):
+        if not page.cacheable or self._current_kwargs:
+            page.destroy()
+            return
+        page.pack_forget()
+        self._page_cache[type(page)] = page
+        while len(self._page_cache) > PAGE_CACHE_SIZE:
+            self._page_cache.popitem(last=False)[1].destroy()
+
+    @traced("App._on_habits_changed")
+    def _on_habits_changed(self, changed_ids=None):
+        """Подписка на HabitRepository: страницы обновляются только для изменившихся привычек."""
+        for habit_id in changed_ids or ():
+            if habit_id not in self.habits:
+                self.daily_summary.forget(habit_id)
+                heatmap_cache.forget(habit_id)
+        self._refresh_current_page(changed_ids)
+
+    def _refresh_current_page(self, changed_ids=None):
+        """Обновляет показанную страницу сразу, а скрытые в кэше — при следующем показе."""
+        for page in self._page_cache.values():
+            page.mark_stale(changed_ids)
+        if self.current_page:
+            self.current_page.refresh(changed_ids)
 
-        self.current_page.destroy()
-        self.page_stack.pop()
-
-        if not self.page_stack:
-            PreviousPageClass = HabitListPage
-        else:
-            PreviousPageClass = self.page_stack.pop()
-
-        self.navigate_to(PreviousPageClass)
-
-    def _save_data_and_refresh(self):
-        DataManager.save_habits(self.habits)
-        if hasattr(self.current_page, 'display_habits'):
-            self.current_page.display_habits()
+    @traced("App._on_day_changed")
+    def _on_day_changed(self, today):
+        """
+        Наступил новый день: от даты зависят прогресс за сегодня, недельные графики
+        и сводка. Их кэши привязаны к дате, поэтому достаточно обновить страницы.
+        """
+        self._refresh_current_page(None)
 
+    @traced("App._add_or_update_habit")
     def _add_or_update_habit(self, data: dict, habit_id=None):
         if habit_id:
-            habit = next((h for h in self.habits if h.id == habit_id), None)
-            if habit:
-                habit.text, habit.goal, habit.units = data["text"], data["goal"], data["units"]
-                habit.icon, habit.color = data["icon"], data["color"]
+            self.habits.update(habit_id, text=data["text"], goal=data["goal"], units=data["units"],
+                               icon=data["icon"], color=data["color"])
         else:
-            self.habits.append(Habit(**data))
-        self._save_data_and_refresh()
+            self.habits.add(Habit(**data))
+        DataManager.request_save(self.habits)
 
+    @traced("App._delete_habit")
     def _delete_habit(self, habit_id):
-        self.habits = [h for h in self.habits if h.id != habit_id]
-        self._save_data_and_refresh()
+        self.habits.remove(habit_id)
+        DataManager.request_save(self.habits)
 
+    @traced("App._add_progress_to_habit")
     def _add_progress_to_habit(self, habit: Habit, value: float):
-        habit.add_progress(value)
-        self._save_data_and_refresh()
\ No newline at end of file
+        today = clock.today()
+        revision = habit.revision
+        habit.add_progress(value, today)
+        heatmap_cache.progress_added(habit, today, revision)
+        DataManager.save_progress(self.habits, habit, today)
+        self.habits.notify({habit.id})
\ No newline at end of file
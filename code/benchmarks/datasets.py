@@ -0,0 +1,27 @@
+# benchmarks/datasets.py
+"""Синтетические наборы привычек для бенчмарков."""
+import random
+from datetime import date, timedelta
+from models import Habit
+from settings import COLORS
+
+
+def make_habits(habits: int, days: int, fill: float = 0.8, seed: int = 0, end: date = None) -> list[Habit]:
+    """
+    Создаёт habits привычек с историей за последние days дней (по end включительно).
+    fill — доля дней, в которые есть запись прогресса.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=days - 1)
+    colors = list(COLORS.values())
+    result = []
+    for i in range(habits):
+        goal = rng.choice([1, 2, 5, 8, 10])
+        log = {}
+        for d in range(days):
+            if rng.random() < fill:
+                log[(start + timedelta(days=d)).isoformat()] = float(rng.randint(1, goal * 2))
+        result.append(Habit(text=f"Привычка {i:04d}", goal=goal, units="раз", color=colors[i % len(colors)],
+                            icon="default.png", progress_log=log, habit_id=f"bench-{i:04d}"))
+    return result
@@ -0,0 +1,53 @@
+# benchmarks/progress_log_memory.py
+"""
+Сравнение памяти, занимаемой историей прогресса: словарь {дата ISO: значение}
+против компактного представления на массивах (progress_log.py).
+
+Запуск из папки code: python benchmarks/progress_log_memory.py [привычек] [лет]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress_log import CompactProgressLog, DictProgressLog
+
+
+def build_logs(log_class, habits: int, days: int, start: date) -> list:
+    logs = []
+    for h in range(habits):
+        log = log_class()
+        for d in range(days):
+            log.add(start + timedelta(days=d), float((h + d) % 5 + 1))
+        logs.append(log)
+    return logs
+
+
+def measure(log_class, habits: int, days: int, start: date) -> int:
+    gc.collect()
+    tracemalloc.start()
+    logs = build_logs(log_class, habits, days, start)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del logs
+    return used
+
+
+def main():
+    habits = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    days = years * 365
+    start = date.today() - timedelta(days=days)
+    print(f"{habits} привычек × {days} дней ({habits * days} записей)")
+    results = {}
+    for name, log_class in (("dict", DictProgressLog), ("compact", CompactProgressLog)):
+        results[name] = measure(log_class, habits, days, start)
+        print(f"  {name:8}: {results[name] / 2 ** 20:8.2f} МБ ({results[name] / (habits * days):6.1f} байт/день)")
+    print(f"  экономия: в {results['dict'] / results['compact']:.1f} раз")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# benchmarks/run.py
+"""
+Бенчмарки горячих путей: загрузка и сохранение данных, расчёты модели и
+обновление интерфейса на синтетическом наборе привычек.
+
+Запуск из папки code:
+    python benchmarks/run.py --habits 50 --days 1825 --output results.json
+    python benchmarks/run.py --compare baseline.json --margin 0.25
+
+Результаты по умолчанию пишутся в benchmark_results.json (игнорируется git).
+
+Случаи с интерфейсом требуют дисплея. Без него используется виртуальный
+X-дисплей (pyvirtualdisplay + Xvfb), если он установлен, иначе они пропускаются.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datasets import make_habits
+from data_manager import DataManager
+from storage import JsonStorage
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """Медианное время func() по repeat запускам и пиковая память одного запуска."""
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    if setup: setup()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time_s": statistics.median(times), "min_time_s": min(times), "peak_mem_kb": peak / 1024}
+
+
+def data_cases(habits, workdir: str, repeat: int) -> dict:
+    results = {}
+    DataManager._storage = JsonStorage(os.path.join(workdir, "data.json"), os.path.join(workdir, "data.journal"))
+    results["DataManager.save_habits"] = measure(lambda: DataManager.save_habits(habits), repeat)
+    results["DataManager.load_habits"] = measure(DataManager.load_habits, repeat, setup=DataManager.flush)
+    DataManager.flush()
+
+    today = date.today()
+    results["Habit.get_weekly_data"] = measure(lambda: [h.get_weekly_data(today) for h in habits], repeat)
+    results["Habit.get_progress_percent"] = measure(lambda: [h.get_progress_percent(today) for h in habits], repeat)
+    return results
+
+
+def open_display():
+    """Проверяет, можно ли создать окно Tk; при необходимости запускает виртуальный дисплей."""
+    import tkinter
+    try:
+        tkinter.Tk().destroy()
+        return None, None
+    except tkinter.TclError as e:
+        reason = f"нет дисплея ({e})"
+    try:
+        from pyvirtualdisplay import Display
+        display = Display(visible=False, size=(1280, 1024))
+        display.start()
+        tkinter.Tk().destroy()
+        return display, None
+    except Exception as e:  # pyvirtualdisplay не установлен или Xvfb не запускается
+        return None, f"{reason}; виртуальный дисплей недоступен ({e})"
+
+
+def count_widgets(widget) -> int:
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def ui_cases(habits, workdir: str, repeat: int) -> dict:
+    from app import App
+    from pages import StatisticsPage, SummaryGraph
+
+    DataManager._storage = JsonStorage(os.path.join(workdir, "ui.json"), os.path.join(workdir, "ui.journal"))
+    app = App()
+    app.withdraw()
+    while app.current_page is None:  # список строится после фоновой загрузки
+        app.update()
+    app.habits.replace_all(habits)
+    results = {}
+    try:
+        page = app.current_page
+
+        def rebuild():
+            for card in page.cards.values(): card.destroy()
+            page.cards, page._order = {}, []
+            if page.virtual_list: page.virtual_list.set_habits([])
+
+        def settle(): app.update()
+
+        results["HabitListPage.display_habits (build)"] = measure(
+            lambda: (page.display_habits(), app.update_idletasks()), repeat, setup=lambda: (rebuild(), settle()))
+        results["HabitListPage.display_habits (build)"]["widgets"] = count_widgets(page)
+        results["HabitListPage.display_habits (one changed)"] = measure(
+            lambda: (page.display_habits({habits[0].id}), app.update_idletasks()), repeat)
+
+        graphs = []
+        for habit in habits[:20]:
+            graph = SummaryGraph(page, habit, bg_color="white")
+            graph.pack(fill="x")
+            graphs.append(graph)
+        settle()
+        results["SummaryGraph.update_graph"] = measure(lambda: [g.update_graph() for g in graphs], repeat)
+        results["SummaryGraph.update_graph"]["widgets"] = len(graphs)
+        for graph in graphs: graph.destroy()
+
+        app.navigate_to(StatisticsPage)
+        settle()
+        stats_page = app.current_page
+        results["StatisticsPage._update_content"] = measure(
+            lambda: (stats_page._update_content(), app.update_idletasks()), repeat)
+        results["StatisticsPage._update_content"]["widgets"] = count_widgets(stats_page)
+    finally:
+        DataManager.flush()
+        app.destroy()
+    return results
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["cases"]
+
+
+def compare(results: dict, baseline: dict, margin: float) -> list[str]:
+    """Возвращает список случаев, которые медленнее базовых или расходуют больше памяти больше чем на margin."""
+    regressions = []
+    for name, result in results["cases"].items():
+        base = baseline.get(name)
+        if not base: continue
+        slower = result["time_s"] > base["time_s"] * (1 + margin)
+        heavier = "peak_mem_kb" in base and result["peak_mem_kb"] > base["peak_mem_kb"] * (1 + margin)
+        status = "РЕГРЕССИЯ" if slower or heavier else "ok"
+        print(f"  {status:9} {name}: {result['time_s'] * 1000:.2f} мс (база {base['time_s'] * 1000:.2f} мс), "
+              f"{result['peak_mem_kb']:.0f} КБ (база {base.get('peak_mem_kb', 0):.0f} КБ)")
+        if slower or heavier: regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки Momentum")
+    parser.add_argument("--habits", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365 * 5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON с прошлыми результатами для сравнения")
+    parser.add_argument("--margin", type=float, default=0.2, help="допустимое замедление, доля (0.2 = 20%%)")
+    parser.add_argument("--no-ui", action="store_true", help="пропустить случаи с интерфейсом")
+    args = parser.parse_args(argv)
+
+    # База читается до запуска: иначе --output с тем же путём перезаписал бы её
+    baseline = None
+    if args.compare:
+        if os.path.abspath(args.compare) == os.path.abspath(args.output):
+            print(f"Ошибка: --compare и --output указывают на один файл {args.output}; задайте другой --output.")
+            return 2
+        try:
+            baseline = load_baseline(args.compare)
+        except (IOError, json.JSONDecodeError, KeyError) as e:
+            print(f"Ошибка: Не удалось прочитать базу {args.compare}. Причина: {e}")
+            return 2
+
+    habits = make_habits(args.habits, args.days)
+    results = {
+        "meta": {"habits": args.habits, "days": args.days, "repeat": args.repeat, "python": platform.python_version(),
+                 "platform": platform.platform()},
+        "cases": {}, "skipped": {}
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        results["cases"].update(data_cases(habits, workdir, args.repeat))
+        if args.no_ui:
+            results["skipped"]["ui"] = "отключено флагом --no-ui"
+        else:
+            display, reason = open_display()
+            if reason:
+                results["skipped"]["ui"] = reason
+            else:
+                try:
+                    results["cases"].update(ui_cases(habits, workdir, args.repeat))
+                finally:
+                    if display: display.stop()
+
+    for name, result in results["cases"].items():
+        extra = f", виджетов {result['widgets']}" if "widgets" in result else ""
+        print(f"{name}: {result['time_s'] * 1000:.2f} мс, пик памяти {result['peak_mem_kb']:.0f} КБ{extra}")
+    for name, reason in results["skipped"].items():
+        print(f"пропущено {name}: {reason}")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.margin)
+        if regressions:
+            print(f"Хуже базы (время или память) более чем на {args.margin:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# clock.py
+from datetime import date, datetime, time, timedelta
+
+
+class Clock:
+    """
+    Текущий день для всего приложения. Дата кэшируется и меняется одним
+    вызовом after() в локальную полночь, после чего подписчики получают
+    новый день. Без start() (скрипты, бенчмарки) дата остаётся датой импорта.
+    """
+    ROLLOVER_SLACK_MS = 50  # срабатываем чуть позже полуночи, чтобы date.today() уже сменилась
+
+    def __init__(self):
+        self._today = date.today()
+        self._listeners = []
+        self._widget = None
+        self._after_id = None
+
+    def today(self) -> date:
+        return self._today
+
+    def subscribe(self, listener):
+        """listener(today) вызывается в потоке интерфейса после смены дня."""
+        self._listeners.append(listener)
+
+    def start(self, widget):
+        """Начинает следить за сменой дня через widget.after()."""
+        self._widget = widget
+        self._today = date.today()
+        self._schedule()
+
+    def stop(self):
+        if self._widget is not None and self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+        self._widget, self._after_id = None, None
+
+    def _schedule(self):
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+        delay_ms = int((midnight - now).total_seconds() * 1000) + self.ROLLOVER_SLACK_MS
+        self._after_id = self._widget.after(delay_ms, self._on_timer)
+
+    def _on_timer(self):
+        self._after_id = None
+        today = date.today()
+        if today != self._today:
+            self._today = today
+            for listener in self._listeners:
+                listener(today)
+        # Таймер мог сработать раньше (перевод часов) — тогда просто ждём следующую полночь
+        self._schedule()
+
+
+clock = Clock()
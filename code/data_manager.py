@@ -1,45 +1,67 @@
 # data_manager.py
-import json
-import os
+from datetime import date, timedelta
+from clock import clock
+from instrumentation import traced
 from models import Habit
-from settings import DATA_FILE
+from repository import HabitRepository
+from settings import STORAGE_BACKEND, LAZY_HISTORY, EAGER_HISTORY_DAYS
+from storage import Storage, create_storage
+import transfer
 
 
 class DataManager:
-    @staticmethod
-    def save_habits(habits: list[Habit]):
-        try:
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump([h.to_dict() for h in habits], f, ensure_ascii=False, indent=4)
-        except IOError as e:
-            print(f"Критическая ошибка: Не удалось сохранить данные в {DATA_FILE}. Причина: {e}")
-
-    @staticmethod
-    def load_habits() -> list[Habit]:
-        if not os.path.exists(DATA_FILE):
-            return []
-        try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if not isinstance(data, list):
-                    print(f"Ошибка: {DATA_FILE} содержит неверный формат данных (не список).")
-                    return []
-        except (IOError, json.JSONDecodeError) as e:
-            print(f"Критическая ошибка: Не удалось прочитать или декодировать {DATA_FILE}. Причина: {e}")
-            return []
-
-        valid_habits = []
-        for habit_data in data:
-            try:
-                if not isinstance(habit_data.get("goal"), (int, float)) or habit_data["goal"] <= 0:
-                    print(f"Пропущена привычка с неверной целью: {habit_data.get('text')}")
-                    continue
-                if not all(key in habit_data for key in ["text", "units", "goal"]):
-                    print(f"Пропущена привычка с отсутствующими полями: {habit_data.get('text')}")
-                    continue
-
-                valid_habits.append(Habit.from_dict(habit_data))
-            except (TypeError, KeyError, ValueError) as e:
-                print(f"Пропущена поврежденная запись о привычке: {habit_data}. Причина: {e}")
-
-        return valid_habits
\ No newline at end of file
+    """Точка доступа приложения к хранилищу, выбранному в settings.STORAGE_BACKEND."""
+    _storage: Storage = None
+
+    @classmethod
+    def storage(cls) -> Storage:
+        if cls._storage is None:
+            cls._storage = create_storage(STORAGE_BACKEND)
+        return cls._storage
+
+    @classmethod
+    @traced("DataManager.save_habits")
+    def save_habits(cls, habits: list[Habit]):
+        cls.storage().save_habits(habits)
+
+    @classmethod
+    @traced("DataManager.request_save")
+    def request_save(cls, habits: list[Habit]):
+        cls.storage().request_save(habits)
+
+    @classmethod
+    @traced("DataManager.save_progress")
+    def save_progress(cls, habits: list[Habit], habit: Habit, on_date: date):
+        cls.storage().save_progress(habits, habit, on_date)
+
+    @classmethod
+    @traced("DataManager.import_progress")
+    def import_progress(cls, habits: HabitRepository, path: str, merge: str = "sum", on_progress=None):
+        """Импортирует прогресс из CSV / JSON Lines в habits и сохраняет результат."""
+        report = transfer.import_progress(habits, path, merge=merge, on_progress=on_progress)
+        if report.imported:
+            habits.extend(report.created)
+            updated = report.touched - {habit.id for habit in report.created}
+            if updated: habits.notify(updated)
+            cls.save_habits(habits)
+        return report
+
+    @classmethod
+    @traced("DataManager.export_progress")
+    def export_progress(cls, habits: list[Habit], path: str, habit_ids=None, start: date = None, end: date = None,
+                        on_progress=None) -> int:
+        """Выгружает прогресс привычек (всех или habit_ids) за период в CSV / JSON Lines."""
+        return transfer.export_progress(habits, path, habit_ids=habit_ids, start=start, end=end,
+                                        on_progress=on_progress)
+
+    @classmethod
+    @traced("DataManager.flush")
+    def flush(cls):
+        cls.storage().flush()
+
+    @classmethod
+    @traced("DataManager.load_habits")
+    def load_habits(cls) -> list[Habit]:
+        """Загружает привычки; при LAZY_HISTORY сразу читаются только последние дни."""
+        history_since = clock.today() - timedelta(days=EAGER_HISTORY_DAYS - 1) if LAZY_HISTORY else None
+        return cls.storage().load_habits(history_since)
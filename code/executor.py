@@ -0,0 +1,146 @@
+# executor.py
+import queue
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from settings import EXECUTOR_IO_WORKERS, EXECUTOR_PROCESS_WORKERS
+
+
+class Task:
+    """Задача исполнителя. cancel() снимает её с очереди, если она ещё не началась, и отменяет доставку результата."""
+    __slots__ = ("key", "future", "on_done", "on_error", "cancelled")
+
+    def __init__(self, key, on_done, on_error):
+        self.key, self.on_done, self.on_error = key, on_done, on_error
+        self.future = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None: self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+
+class TaskExecutor:
+    """
+    Фоновые задачи: пул потоков для ввода-вывода и, если включён в settings,
+    пул процессов для тяжёлых расчётов (функция и аргументы должны сериализоваться).
+
+    Новая задача с тем же key заменяет предыдущую: ещё не начатая снимается
+    с очереди, а результат уже идущей не доставляется. Результаты передаются
+    в on_done / on_error в потоке интерфейса: после attach() очередь готовых
+    задач разбирается через after(), пока есть задачи, ждущие доставки.
+    Без attach() (скрипты, бенчмарки) обработчики вызываются в рабочем потоке.
+    """
+    POLL_MS = 15
+    THREAD_PREFIX = "momentum-io"
+    COMPUTE_PREFIX = "momentum-compute"
+
+    def __init__(self, io_workers: int = EXECUTOR_IO_WORKERS, process_workers: int = EXECUTOR_PROCESS_WORKERS):
+        self._threads = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix=self.THREAD_PREFIX)
+        self._process_workers = process_workers
+        self._processes = None  # пул процессов или, если он отключён, отдельный поток расчётов
+        self._lock = threading.Lock()
+        self._latest = {}  # key -> последняя задача с этим ключом
+        self._pending = set()  # задачи, которые ещё не завершились
+        self._awaiting = 0  # завершённые или идущие задачи, чей результат нужно доставить
+        self._results = queue.SimpleQueue()
+        self._widget = None
+        self._pump_id = None
+
+    def attach(self, widget):
+        """Доставлять результаты в поток интерфейса через widget.after()."""
+        self._widget = widget
+
+    def submit(self, fn, *args, key=None, on_done=None, on_error=None, process: bool = False) -> Task:
+        """
+        Выполняет fn(*args) в фоне. process=True — в пуле процессов (если он
+        отключён, в отдельном потоке расчётов, а не в очереди ввода-вывода). Обработчики результата можно передавать
+        только из потока интерфейса.
+        """
+        task = Task(key, on_done, on_error)
+        deliver = on_done is not None or on_error is not None
+        with self._lock:
+            previous = self._latest.get(key) if key is not None else None
+            if key is not None: self._latest[key] = task
+            pool = self._process_pool() if process else self._threads
+            task.future = pool.submit(fn, *args)
+            self._pending.add(task)
+            if deliver: self._awaiting += 1
+        # Вне блокировки: отмена сразу вызывает _on_finished отменённой задачи
+        if previous is not None: previous.cancel()
+        task.future.add_done_callback(lambda _: self._on_finished(task, deliver))
+        if deliver and self._widget is not None and self._pump_id is None:
+            self._pump_id = self._widget.after(self.POLL_MS, self._pump)
+        return task
+
+    def wait(self, tasks=None, timeout: float = None):
+        """
+        Дожидается задач tasks (по умолчанию — всех). В рабочем потоке не ждёт:
+        при одном потоке ввода-вывода все ранее поставленные задачи уже выполнены.
+        """
+        if threading.current_thread().name.startswith(self.THREAD_PREFIX): return
+        with self._lock:
+            futures = [task.future for task in (self._pending if tasks is None else tasks)]
+        wait(futures, timeout)
+
+    def shutdown(self):
+        """Останавливает доставку результатов и пулы; начатые задачи дорабатывают."""
+        if self._widget is not None and self._pump_id is not None:
+            self._widget.after_cancel(self._pump_id)
+        self._widget, self._pump_id = None, None
+        self._threads.shutdown(wait=True, cancel_futures=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def _process_pool(self):
+        if self._processes is None:
+            if self._process_workers:
+                self._processes = ProcessPoolExecutor(max_workers=self._process_workers)
+            else:
+                self._processes = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.COMPUTE_PREFIX)
+        return self._processes
+
+    def _on_finished(self, task: Task, deliver: bool):
+        with self._lock:
+            self._pending.discard(task)
+            if self._latest.get(task.key) is task: del self._latest[task.key]
+        if not deliver:
+            if not task.future.cancelled() and task.future.exception() is not None:
+                print(f"Ошибка в фоновой задаче: {task.future.exception()}")
+            return
+        if self._widget is None:
+            self._deliver(task)
+        else:
+            self._results.put(task)
+
+    def _pump(self):
+        self._pump_id = None
+        while True:
+            try:
+                task = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._deliver(task)
+        if self._awaiting > 0 and self._widget is not None:
+            self._pump_id = self._widget.after(self.POLL_MS, self._pump)
+
+    def _deliver(self, task: Task):
+        with self._lock:
+            self._awaiting -= 1
+        if task.cancelled: return
+        try:
+            result = task.future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            if task.on_error:
+                task.on_error(e)
+            else:
+                print(f"Ошибка в фоновой задаче: {e}")
+            return
+        if task.on_done: task.on_done(result)
+
+
+executor = TaskExecutor()
@@ -0,0 +1,103 @@
+# heatmap.py
+from collections import OrderedDict
+from datetime import date
+from settings import HEATMAP_CACHE_TILES
+
+CELL, GAP = 6, 2  # размер клетки дня и промежуток между клетками, px
+THEMES = {
+    "Light": {"background": (235, 235, 235), "empty": (214, 214, 218)},  # фон страницы — gray92
+    "Dark": {"background": (0, 0, 0), "empty": (44, 44, 46)},
+}
+
+
+def year_bounds(year: int) -> tuple[date, date]:
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+def year_values(habits, year: int) -> list:
+    """Прогресс привычек за год: по одному array('d') на привычку, дни без записи — NaN."""
+    start, end = year_bounds(year)
+    return [habit.progress_between(start, end) for habit in habits]
+
+
+def render_year(values: list, goals: list, year: int, color: str, theme: str):
+    """
+    Рисует календарь года одним изображением PIL: столбцы — недели, строки —
+    дни недели. Цвет клетки — доля выполнения цели за день (для нескольких
+    привычек — средняя), от цвета пустой клетки до color. Функция не трогает
+    объекты приложения, поэтому может выполняться в пуле процессов.
+    """
+    import numpy as np
+    from PIL import Image
+
+    start, end = year_bounds(year)
+    days = (end - start).days + 1
+    matrix = np.array([np.frombuffer(v, dtype=float) for v in values]).reshape(len(goals), days)
+    ratios = np.clip(np.nan_to_num(matrix, nan=0.0) / np.asarray(goals, dtype=float)[:, None], 0.0, 1.0)
+    ratios = ratios.mean(axis=0) if len(goals) else np.zeros(days)
+
+    first = start.weekday()
+    slots = np.arange(days) + first
+    weeks = (first + days + 6) // 7
+    grid = np.full((7, weeks), -1.0)  # -1 — клетки вне года
+    grid[slots % 7, slots // 7] = ratios
+
+    palette = THEMES.get(theme, THEMES["Light"])
+    background, empty = np.array(palette["background"], dtype=float), np.array(palette["empty"], dtype=float)
+    full = np.array([int(color[i:i + 2], 16) for i in (1, 3, 5)], dtype=float)
+    shade = np.where(grid > 0, 0.3 + 0.7 * grid, 0.0)[..., None]
+    cells = np.where((grid >= 0)[..., None], empty + (full - empty) * shade, background).astype(np.uint8)
+
+    step = CELL + GAP
+    pixels = np.repeat(np.repeat(cells, step, axis=0), step, axis=1)
+    inside = (np.arange(7 * step) % step < CELL)[:, None] & (np.arange(weeks * step) % step < CELL)[None, :]
+    pixels[~inside] = background.astype(np.uint8)
+    return Image.fromarray(np.ascontiguousarray(pixels[:7 * step - GAP, :weeks * step - GAP]), "RGB")
+
+
+class HeatmapCache:
+    """
+    Готовые изображения календаря по ключу (id привычки или ALL, год, тема).
+
+    Вместе с изображением хранятся ревизии привычек, по данным которых оно
+    нарисовано, и цвет. Изображение годится, пока ревизии совпадают. Когда
+    прогресс добавлен за один день (progress_added), изображения других годов
+    переносятся на новую ревизию и не перерисовываются.
+    """
+    ALL = "all"
+
+    def __init__(self, max_tiles: int = HEATMAP_CACHE_TILES):
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()  # ключ -> ({id привычки: ревизия}, цвет, изображение)
+
+    @staticmethod
+    def revisions(habits) -> dict:
+        return {habit.id: habit.revision for habit in habits}
+
+    def get(self, tile_id, habits, year: int, theme: str, color: str):
+        key = (tile_id, year, theme)
+        entry = self._tiles.get(key)
+        if entry is None or entry[1] != color or entry[0] != self.revisions(habits):
+            return None
+        self._tiles.move_to_end(key)
+        return entry[2]
+
+    def put(self, tile_id, year: int, theme: str, revisions: dict, color: str, image):
+        key = (tile_id, year, theme)
+        self._tiles[key] = (dict(revisions), color, image)
+        self._tiles.move_to_end(key)
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+    def progress_added(self, habit, day: date, previous_revision: int):
+        """Прогресс habit изменился только за day: остальные годы остаются действительными."""
+        for (_, year, _), (revisions, _, _) in self._tiles.items():
+            if year != day.year and revisions.get(habit.id) == previous_revision:
+                revisions[habit.id] = habit.revision
+
+    def forget(self, habit_id):
+        for key in [key for key in self._tiles if key[0] == habit_id]:
+            del self._tiles[key]
+
+
+heatmap_cache = HeatmapCache()
@@ -0,0 +1,57 @@
+# icons.py
+import os
+import threading
+import customtkinter as ctk
+from settings import ICONS_PATH
+
+
+class IconCache:
+    """
+    Общий кэш иконок: каждый PNG читается с диска и масштабируется один раз
+    для каждой пары (файл, размер), после чего один CTkImage используется всеми карточками.
+    """
+
+    def __init__(self, icons_path: str = ICONS_PATH):
+        self.icons_path = icons_path
+        self._decoded = {}  # (файл, размер) -> PIL.Image или None, если файла нет
+        self._images = {}  # (файл, размер) -> CTkImage или None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filename: str, size=(20, 20)):
+        """Возвращает CTkImage нужного размера или None, если иконку не удалось загрузить."""
+        key = (filename, tuple(size))
+        if key in self._images:
+            self.hits += 1
+            return self._images[key]
+        self.misses += 1
+        image = self._decode(key)
+        self._images[key] = ctk.CTkImage(image, size=key[1]) if image else None
+        return self._images[key]
+
+    def preload(self, filenames, size=(20, 20)):
+        """Заранее декодирует иконки в текущем потоке (например, в фоновой задаче); CTkImage создаются позже, в потоке интерфейса."""
+        for filename in filenames:
+            self._decode((filename, tuple(size)))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "decoded": len(self._decoded)}
+
+    def _decode(self, key):
+        with self._lock:
+            if key in self._decoded:
+                return self._decoded[key]
+        from PIL import Image  # PIL нужен только при первой загрузке иконки
+        filename, size = key
+        try:
+            with Image.open(os.path.join(self.icons_path, filename)) as image:
+                decoded = image.convert("RGBA").resize(size)
+        except (OSError, ValueError) as e:
+            print(f"Не удалось загрузить иконку {filename}. Причина: {e}")
+            decoded = None
+        with self._lock:
+            return self._decoded.setdefault(key, decoded)
+
+
+icon_cache = IconCache()
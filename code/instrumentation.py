@@ -0,0 +1,120 @@
+# instrumentation.py
+"""
+Необязательная инструментовка горячих путей: интервалы времени, счётчики
+виджетов по страницам и выгрузка в формате Chrome trace (chrome://tracing, Perfetto).
+
+Включается флагом settings.INSTRUMENTATION или переменной окружения MOMENTUM_TRACE=1.
+В выключенном состоянии декоратор traced возвращает функцию без обёртки,
+так что накладных расходов практически нет.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from settings import INSTRUMENTATION
+
+ENABLED = INSTRUMENTATION or os.environ.get("MOMENTUM_TRACE") == "1"
+_widget_counters_installed = False
+
+
+class Tracer:
+    def __init__(self, max_events: int = 100_000):
+        self.events = deque(maxlen=max_events)  # (имя, начало, длительность, id потока)
+        self.widgets = {}  # страница -> {"created": n, "destroyed": n}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, duration: float):
+        with self._lock:
+            self.events.append((name, start, duration, threading.get_ident()))
+
+    def count_widget(self, page: str, kind: str):
+        counters = self.widgets.setdefault(page, {"created": 0, "destroyed": 0})
+        counters[kind] += 1
+
+    def summary(self) -> dict:
+        """{имя: {"count", "total_ms", "max_ms", "last_ms"}} по всем записанным интервалам."""
+        with self._lock:
+            events = list(self.events)
+        result = {}
+        for name, _, duration, _ in events:
+            entry = result.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+            ms = duration * 1000
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["last_ms"] = ms
+        return result
+
+    def to_chrome_trace(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = [{"name": name, "ph": "X", "pid": pid, "tid": tid, "ts": (start - self._origin) * 1e6,
+                  "dur": duration * 1e6} for name, start, duration, tid in events]
+        now = (time.perf_counter() - self._origin) * 1e6
+        for page, counters in self.widgets.items():
+            trace.append({"name": f"widgets: {page}", "ph": "C", "pid": pid, "tid": 0, "ts": now, "args": counters})
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export(self, path: str):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+            print(f"Трассировка сохранена в {path}")
+        except IOError as e:
+            print(f"Ошибка: Не удалось сохранить трассировку в {path}. Причина: {e}")
+
+
+tracer = Tracer()
+
+
+def traced(name: str = None):
+    """Декоратор: записывает время каждого вызова функции как интервал name."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.add_span(label, start, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def install_widget_counters():
+    """
+    Считает создание и уничтожение виджетов Tk по страницам. Страница
+    определяется по ближайшему предку с атрибутом trace_name (см. pages.Page).
+    """
+    global _widget_counters_installed
+    if not ENABLED or _widget_counters_installed:
+        return
+    _widget_counters_installed = True
+    import tkinter
+
+    def page_of(widget) -> str:
+        while widget is not None:
+            name = getattr(widget, "trace_name", None)
+            if name: return name
+            widget = getattr(widget, "master", None)
+        return "<app>"
+
+    original_init, original_destroy = tkinter.BaseWidget.__init__, tkinter.BaseWidget.destroy
+
+    def counting_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        tracer.count_widget(page_of(self), "created")
+
+    def counting_destroy(self):
+        tracer.count_widget(page_of(self), "destroyed")
+        original_destroy(self)
+
+    tkinter.BaseWidget.__init__, tkinter.BaseWidget.destroy = counting_init, counting_destroy
@@ -1,6 +1,11 @@
 # main.py
-from app import App
+import sys
+from startup_profile import StartupProfile
 
 if __name__ == "__main__":
-    app = App()
-    app.mainloop()
\ No newline at end of file
+    profile = StartupProfile() if "--profile-startup" in sys.argv[1:] else None
+    if profile: profile.track_imports()
+    from app import App
+    if profile: profile.mark("импорт app")
+    app = App(profile=profile)
+    app.mainloop()
@@ -1,66 +1,325 @@
 # models.py
+import math
 import uuid
 from datetime import date, timedelta
 import random
-from settings import AVAILABLE_ICONS, COLORS
+import threading
+from clock import clock
+from progress_log import make_progress_log
+from settings import COLORS, get_available_icons
+
+# Историю подгружают и фоновые задачи: загрузка и запись прогресса идут под этой блокировкой
+_history_lock = threading.RLock()
+
+
+class HabitStats:
+    """
+    Сводные показатели привычки, которые обновляются при каждом изменении
+    прогресса, а не пересчитываются обходом всей истории.
+
+    current_streak — длина серии выполненных дней, заканчивающейся в streak_end
+    (последний выполненный день); monthly — суммы прогресса по месяцам "ГГГГ-ММ".
+    """
+    __slots__ = ("total", "completed_days", "current_streak", "streak_end", "longest_streak", "monthly")
+
+    def __init__(self):
+        self.total = 0.0
+        self.completed_days = 0
+        self.current_streak = 0
+        self.streak_end = None  # порядковый номер дня (date.toordinal)
+        self.longest_streak = 0
+        self.monthly = {}
+
+    @classmethod
+    def rebuild(cls, progress_log, goal: float):
+        """Пересчитывает показатели по полной истории."""
+        stats = cls()
+        for ordinal, value in progress_log.ordinal_items():
+            stats.total += value
+            key = cls.month_key(date.fromordinal(ordinal))
+            stats.monthly[key] = stats.monthly.get(key, 0.0) + value
+        stats.rebuild_streaks(progress_log, goal)
+        return stats
+
+    def rebuild_streaks(self, progress_log, goal: float):
+        self.completed_days, self.current_streak, self.streak_end, self.longest_streak = 0, 0, None, 0
+        for ordinal, value in progress_log.ordinal_items():
+            if value < goal: continue
+            self.completed_days += 1
+            self.current_streak = self.current_streak + 1 if self.streak_end == ordinal - 1 else 1
+            self.streak_end = ordinal
+            self.longest_streak = max(self.longest_streak, self.current_streak)
+
+    def apply(self, habit, on_date: date, before: float, after: float):
+        """Учитывает изменение прогресса привычки за день с before на after."""
+        goal = habit.goal
+        delta = after - before
+        self.total += delta
+        key = self.month_key(on_date)
+        self.monthly[key] = self.monthly.get(key, 0.0) + delta
+        was_completed, is_completed = before >= goal, after >= goal
+        if was_completed == is_completed: return
+        ordinal = on_date.toordinal()
+        if is_completed and (self.streak_end is None or ordinal > self.streak_end):
+            self.completed_days += 1
+            self.current_streak = self.current_streak + 1 if self.streak_end == ordinal - 1 else 1
+            self.streak_end = ordinal
+            self.longest_streak = max(self.longest_streak, self.current_streak)
+        else:
+            # Изменился день внутри истории: серии могли склеиться или разорваться
+            self.rebuild_streaks(habit.progress_log, goal)
+
+    def copy(self):
+        stats = HabitStats()
+        for field in self.__slots__:
+            setattr(stats, field, getattr(self, field))
+        stats.monthly = dict(self.monthly)
+        return stats
+
+    def current_streak_on(self, today: date) -> int:
+        """Текущая серия на сегодня: продолжается, если последний выполненный день — сегодня или вчера."""
+        if self.streak_end is None or self.streak_end < today.toordinal() - 1: return 0
+        return self.current_streak
+
+    @staticmethod
+    def month_key(day: date) -> str:
+        return f"{day.year:04d}-{day.month:02d}"
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total, "completed_days": self.completed_days, "current_streak": self.current_streak,
+            "streak_end": date.fromordinal(self.streak_end).isoformat() if self.streak_end else None,
+            "longest_streak": self.longest_streak, "monthly": dict(self.monthly)
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        stats = cls()
+        stats.total = float(data["total"])
+        stats.completed_days = int(data["completed_days"])
+        stats.current_streak = int(data["current_streak"])
+        stats.streak_end = date.fromisoformat(data["streak_end"]).toordinal() if data["streak_end"] else None
+        stats.longest_streak = int(data["longest_streak"])
+        stats.monthly = {str(k): float(v) for k, v in data["monthly"].items()}
+        return stats
+
+    def diff(self, other) -> dict:
+        """Поля, в которых показатели расходятся: {поле: (self, other)}."""
+        drift = {}
+        for field in self.__slots__:
+            mine, theirs = getattr(self, field), getattr(other, field)
+            if field == "monthly":
+                keys = set(mine) | set(theirs)
+                same = all(math.isclose(mine.get(k, 0.0), theirs.get(k, 0.0), abs_tol=1e-9) for k in keys)
+            elif field == "total":
+                same = math.isclose(mine, theirs, abs_tol=1e-9)
+            else:
+                same = mine == theirs
+            if not same: drift[field] = (mine, theirs)
+        return drift
+
 
 class Habit:
     """
     Класс, представляющий одну измеримую привычку с целью.
     """
+    __slots__ = ("id", "text", "_goal", "units", "color", "icon", "_progress_log", "_history_loader", "_loaded_from",
+                 "_stats", "revision")
+
     def __init__(self, text: str, goal: float, units: str, color: str = None, icon: str = None,
-                 progress_log: dict = None, habit_id: str = None):
+                 progress_log: dict = None, habit_id: str = None, stats: HabitStats = None):
         self.id = habit_id if habit_id else str(uuid.uuid4())
         self.text = text
-        self.goal = float(goal)
+        self._goal = float(goal)
         self.units = units
         self.color = color if color else random.choice(list(COLORS.values()))
-        self.icon = icon if icon else random.choice(AVAILABLE_ICONS)
-        self.progress_log = progress_log if progress_log else {}
+        self.icon = icon if icon else random.choice(get_available_icons())
+        self._progress_log = make_progress_log(progress_log)
+        self._history_loader = None
+        self._loaded_from = None  # история до этой даты ещё не загружена
+        self._stats = stats
+        self.revision = 0  # растёт при каждом изменении прогресса или цели; по нему сбрасываются кэши
+
+    @property
+    def goal(self) -> float:
+        return self._goal
+
+    @goal.setter
+    def goal(self, value: float):
+        value = float(value)
+        changed, self._goal = value != self._goal, value
+        if changed: self.revision += 1
+        if changed and self._stats is not None:
+            self._stats.rebuild_streaks(self.progress_log, value)
+
+    @property
+    def stats(self) -> HabitStats:
+        """Сводные показатели; без сохранённых показателей считаются по истории один раз."""
+        if self._stats is None:
+            self._stats = HabitStats.rebuild(self.progress_log, self._goal)
+        return self._stats
+
+    def verify_stats(self) -> dict:
+        """
+        Пересчитывает показатели по истории и возвращает расхождения с
+        сохранёнными: {поле: (сохранено, по истории)}. Пустой словарь — всё сходится.
+        """
+        return self.stats.diff(HabitStats.rebuild(self.progress_log, self._goal))
+
+    @property
+    def progress_log(self) -> dict:
+        """Полная история прогресса (при ленивой загрузке подгружается при первом обращении)."""
+        if self._history_loader: self._load_history()
+        return self._progress_log
+
+    def defer_history(self, loader, loaded_from: date):
+        """
+        Откладывает загрузку истории раньше loaded_from: loader() вернёт её
+        словарём {дата ISO: значение}, когда она впервые понадобится.
+        """
+        self._history_loader, self._loaded_from = loader, loaded_from
+
+    def history_loaded_since(self, day: date) -> bool:
+        """True, если прогресс начиная с day уже в памяти и чтение не обратится к хранилищу."""
+        return self._loaded_from is None or day >= self._loaded_from
+
+    def _load_history(self):
+        """
+        Подгружает отложенную историю. Пока загрузка идёт, загрузчик остаётся
+        на месте: читатели старых дней ждут её на блокировке, а не видят пустоту.
+        """
+        with _history_lock:
+            loader = self._history_loader
+            if loader is None: return  # уже загружена другим потоком
+            history = loader() or {}
+            log = self._progress_log
+            for day, value in history.items():
+                if day not in log: log[day] = value
+            self._history_loader, self._loaded_from = None, None
+            self.revision += 1
 
     def get_progress_on(self, check_date: date) -> float:
         """Возвращает прогресс за указанный день."""
-        return self.progress_log.get(check_date.isoformat(), 0.0)
+        if self._loaded_from and check_date < self._loaded_from: self._load_history()
+        return self._progress_log.value_on(check_date)
+
+    def add_progress(self, value: float, on_date: date = None):
+        """Добавляет значение к прогрессу за указанный день (по умолчанию — сегодня)."""
+        on_date = on_date or clock.today()
+        self.set_progress(on_date, self.get_progress_on(on_date) + float(value))
+
+    def set_progress(self, on_date: date, value: float):
+        """Устанавливает итоговый прогресс за день и обновляет сводные показатели."""
+        stats = self.stats
+        with _history_lock:
+            before = self.get_progress_on(on_date)
+            self._progress_log.set_on(on_date, float(value))
+            self.revision += 1
+        stats.apply(self, on_date, before, float(value))
 
-    def add_progress(self, value: float, on_date: date = date.today()):
-        """Добавляет значение к прогрессу за указанный день."""
-        key = on_date.isoformat()
-        current_progress = self.get_progress_on(on_date)
-        self.progress_log[key] = current_progress + float(value)
+    def merge_progress(self, entries, replace: bool = False):
+        """
+        Массово вносит пары (день, значение): заменяет прогресс за день или
+        прибавляет к нему. Показатели пересчитаются один раз при следующем обращении.
+        """
+        with _history_lock:
+            log = self.progress_log
+            for day, value in entries:
+                log.set_on(day, float(value) if replace else log.value_on(day) + float(value))
+            self.revision += 1
+            self._stats = None
 
-    def get_progress_percent(self, on_date: date = date.today()) -> float:
-        """Возвращает процент выполнения цели за день."""
+    def get_progress_percent(self, on_date: date = None) -> float:
+        """Возвращает процент выполнения цели за день (по умолчанию — сегодня)."""
         if self.goal == 0: return 100.0
-        progress = self.get_progress_on(on_date)
+        progress = self.get_progress_on(on_date or clock.today())
         return min(100.0, (progress / self.goal) * 100.0)
 
+    def progress_between(self, start: date, end: date):
+        """Прогресс за дни start..end подряд в виде array('d'); дни без записи — NaN."""
+        if self._loaded_from and start < self._loaded_from: self._load_history()
+        return self._progress_log.values_between(start, end)
+
+    def first_logged_day(self) -> date | None:
+        """Самый ранний день с записью прогресса."""
+        first = next(iter(self.progress_log.ordinal_items()), None)
+        return date.fromordinal(first[0]) if first else None
+
     def is_completed_on(self, check_date: date) -> bool:
         """Проверяет, достигнута ли цель в указанный день."""
         return self.get_progress_on(check_date) >= self.goal
 
-    def get_summary_text(self, on_date: date = date.today()) -> str:
-        """Возвращает текстовое описание прогресса."""
-        progress = self.get_progress_on(on_date)
+    def get_summary_text(self, on_date: date = None) -> str:
+        """Возвращает текстовое описание прогресса за день (по умолчанию — сегодня)."""
+        progress = self.get_progress_on(on_date or clock.today())
         return f"{progress:.1f} из {self.goal:.1f} {self.units}"
 
-    def get_weekly_data(self, today: date = date.today()) -> dict:
+    def get_weekly_data(self, today: date = None) -> dict:
         """Возвращает данные о прогрессе за последние 7 дней."""
+        today = today or clock.today()
         data = {}
         for i in range(6, -1, -1):
             day = today - timedelta(days=i)
             data[day] = self.get_progress_on(day)
         return data
 
+    def snapshot(self):
+        """
+        Независимая копия привычки для записи в фоне. История копируется
+        массивами; словарь для JSON строит уже поток записи (to_dict).
+        """
+        copy = Habit.__new__(Habit)
+        copy.id, copy.text, copy._goal, copy.units = self.id, self.text, self._goal, self.units
+        copy.color, copy.icon, copy.revision = self.color, self.icon, self.revision
+        copy._progress_log = self.progress_log.copy()
+        copy._history_loader, copy._loaded_from = None, None
+        copy._stats = self._stats.copy() if self._stats is not None else None
+        return copy
+
     def to_dict(self) -> dict:
         return {
             "id": self.id, "text": self.text, "goal": self.goal, "units": self.units,
-            "color": self.color, "icon": self.icon, "progress_log": self.progress_log
+            "color": self.color, "icon": self.icon, "progress_log": self.progress_log.to_dict(),
+            "stats": self.stats.to_dict()
         }
 
     @classmethod
     def from_dict(cls, data: dict):
+        try:
+            stats = HabitStats.from_dict(data["stats"]) if data.get("stats") else None
+        except (TypeError, KeyError, ValueError, AttributeError):
+            stats = None  # пересчитаются по истории при первом обращении
         return cls(
             habit_id=data.get("id"), text=data.get("text"), goal=data.get("goal", 1),
             units=data.get("units", "раз"), color=data.get("color"), icon=data.get("icon"),
-            progress_log=data.get("progress_log", {})
-        )
\ No newline at end of file
+            progress_log=data.get("progress_log", {}), stats=stats
+        )
+
+
+class DailySummary:
+    """
+    Прогресс привычек за день, общий для списка привычек и сводки. Значения
+    пересчитываются, только когда изменилась привычка (Habit.revision) или день.
+    """
+
+    def __init__(self):
+        self._cache = {}  # id привычки -> (ключ, прогресс, процент, текст)
+
+    def get(self, habit: Habit, on_date: date = None) -> tuple[float, float, str]:
+        """Возвращает (прогресс, процент выполнения, текст сводки) привычки за день."""
+        on_date = on_date or clock.today()
+        key = (habit.revision, on_date, habit.units)
+        cached = self._cache.get(habit.id)
+        if cached is None or cached[0] != key:
+            cached = (key, habit.get_progress_on(on_date), habit.get_progress_percent(on_date),
+                      habit.get_summary_text(on_date))
+            self._cache[habit.id] = cached
+        return cached[1:]
+
+    def active(self, habits, on_date: date = None) -> list[tuple[Habit, float]]:
+        """Привычки с прогрессом за день и их проценты выполнения."""
+        entries = ((habit, self.get(habit, on_date)) for habit in habits)
+        return [(habit, percent) for habit, (progress, percent, _) in entries if progress > 0]
+
+    def forget(self, habit_id: str):
+        self._cache.pop(habit_id, None)
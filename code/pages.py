@@ -1,15 +1,73 @@
 # pages.py
 import customtkinter as ctk
-from PIL import Image
-import os
-from datetime import date
+from bisect import bisect_right
+from clock import clock
+from datetime import timedelta
+from executor import executor
+from heatmap import heatmap_cache, render_year, year_values
+from icons import icon_cache
+from instrumentation import traced, tracer
 from models import Habit
-from settings import ICONS_PATH, AVAILABLE_ICONS, COLORS, DESTRUCTIVE_COLOR, ERROR_COLOR
+from settings import COLORS, get_available_icons, DESTRUCTIVE_COLOR, ERROR_COLOR, VIRTUAL_LIST_MIN_HABITS, TRACE_FILE
 
 class Page(ctk.CTkFrame):
+    cacheable = True  # можно ли скрыть страницу и показать её снова вместо пересоздания
+
     def __init__(self, master, app_controller):
         super().__init__(master, fg_color=("gray92", "black"))
         self.app = app_controller
+        self._stale, self._stale_ids = False, set()  # изменения, случившиеся пока страница скрыта
+
+    def refresh(self, changed_ids=None):
+        """Обновляет страницу после изменения привычек changed_ids (None — любых)."""
+
+    def mark_stale(self, changed_ids=None):
+        self._stale = True
+        if changed_ids is None or self._stale_ids is None:
+            self._stale_ids = None
+        else:
+            self._stale_ids |= set(changed_ids)
+
+    def on_show(self):
+        """Вызывается при каждом показе страницы; догоняет изменения, пропущенные в кэше."""
+        if self._stale:
+            changed_ids, self._stale, self._stale_ids = self._stale_ids, False, set()
+            self.refresh(changed_ids)
+
+    @property
+    def trace_name(self) -> str:
+        """Имя страницы для счётчиков виджетов в instrumentation."""
+        return type(self).__name__
+
+
+class TraceOverlay(ctk.CTkToplevel):
+    """Окно отладки: время горячих путей и счётчики виджетов по страницам, обновляется раз в секунду."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Инструментовка")
+        self.geometry("460x360")
+        self.text = ctk.CTkTextbox(self, font=("Menlo", 12), wrap="none")
+        self.text.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+        ctk.CTkButton(self, text="Сохранить трассировку", command=self._export).pack(pady=(0, 10))
+        self._refresh()
+
+    def _export(self):
+        tracer.export(TRACE_FILE)
+
+    def _refresh(self):
+        lines = [f"{'интервал':34} {'n':>5} {'посл.':>7} {'сред.':>7} {'макс.':>7}"]
+        for name, entry in sorted(tracer.summary().items()):
+            lines.append(f"{name[:34]:34} {entry['count']:>5} {entry['last_ms']:>7.1f} "
+                         f"{entry['total_ms'] / entry['count']:>7.1f} {entry['max_ms']:>7.1f}")
+        lines += ["", f"{'виджеты':34} {'созд.':>7} {'удал.':>7}"]
+        for page, counters in sorted(tracer.widgets.items()):
+            lines.append(f"{page[:34]:34} {counters['created']:>7} {counters['destroyed']:>7}")
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state="disabled")
+        self.after(1000, self._refresh)
 
 
 class ConfirmationDialog(ctk.CTkToplevel):
@@ -86,38 +144,97 @@ class AddProgressWindow(ctk.CTkToplevel):
             pass
 
 class SummaryGraph(ctk.CTkFrame):
+    """
+    Столбцы прогресса за неделю. Элементы холста создаются один раз и затем
+    только перемещаются; изменение размера перерисовывается один раз за цикл простоя.
+    """
+    DAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
     def __init__(self, master, habit: Habit, bg_color):
         super().__init__(master, fg_color=bg_color, corner_radius=16)
         self.habit = habit
         self.canvas = ctk.CTkCanvas(self, height=120, highlightthickness=0, bg=self._apply_appearance_mode(bg_color))
         self.canvas.pack(fill="x", expand=True, padx=15, pady=15)
-        self.canvas.bind("<Configure>", self.update_graph)
-
+        self.canvas.bind("<Configure>", self._on_configure)
+        self._goal_line, self._bars, self._labels = None, [], []
+        self._weekly, self._weekly_key = None, None  # кэш недельных данных и (привычка, ревизия, день)
+        self._shown = {}  # что сейчас нарисовано: общая геометрия, значения и подписи столбцов
+        self._resize_pending = False
+
+    def _on_configure(self, event=None):
+        if not self._resize_pending:
+            self._resize_pending = True
+            self.after_idle(self._redraw_after_resize)
+
+    def _redraw_after_resize(self):
+        self._resize_pending = False
+        self.update_graph()
+
+    def _weekly_data(self) -> dict | None:
+        """
+        Данные за неделю из кэша. Если для них нужно дочитать историю из
+        хранилища, чтение идёт в фоне, а график перерисуется по готовности (None).
+        """
+        key = (self.habit.id, self.habit.revision, clock.today())
+        if key == self._weekly_key:
+            return self._weekly
+        if self.habit.history_loaded_since(key[2] - timedelta(days=6)):
+            self._weekly, self._weekly_key = self.habit.get_weekly_data(key[2]), key
+            return self._weekly
+        executor.submit(self.habit.get_weekly_data, key[2], key=("weekly", id(self)),
+                        on_done=lambda data: self._on_weekly_loaded(key, data))
+        return None
+
+    def _on_weekly_loaded(self, key, data: dict):
+        if not self.winfo_exists(): return
+        self._weekly, self._weekly_key = data, key
+        self.update_graph()
+
+    def _create_items(self):
+        label_color = self._apply_appearance_mode(("#6B6B6B", "#9E9E9E"))
+        self._goal_line = self.canvas.create_line(0, 0, 0, 0, fill="gray", width=1, dash=(2, 2))
+        self._bars = [self.canvas.create_line(0, 0, 0, 0, width=20, capstyle='round', state="hidden")
+                      for _ in range(7)]
+        self._labels = [self.canvas.create_text(0, 0, text="", fill=label_color) for _ in range(7)]
+
+    @traced("SummaryGraph.update_graph")
     def update_graph(self, event=None):
-        self.canvas.delete("all")
-        weekly_data = self.habit.get_weekly_data()
-        max_val = max(self.habit.goal, max(weekly_data.values()) if weekly_data else 0)
-        if max_val == 0: max_val = 1
+        """Приводит холст к текущим данным, меняя только изменившиеся элементы."""
         width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
         if width <= 1 or height <= 1: return
+        if self._goal_line is None: self._create_items()
+        weekly_data = self._weekly_data()
+        if weekly_data is None: return
+        max_val = max(self.habit.goal, max(weekly_data.values()) if weekly_data else 0)
+        if max_val == 0: max_val = 1
+        layout = (width, height, max_val, self.habit.goal)
+        if layout != self._shown.get("layout"):
+            goal_y = height - (self.habit.goal / max_val) * (height - 25) - 20
+            self.canvas.coords(self._goal_line, 0, goal_y, width, goal_y)
+        if self.habit.color != self._shown.get("color"):
+            for bar in self._bars: self.canvas.itemconfigure(bar, fill=self.habit.color)
+
         bar_width, gap = 20, (width - (7 * 20)) / 6
-        days = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
-        goal_y = height - (self.habit.goal / max_val) * (height - 25) - 20
-        self.canvas.create_line(0, goal_y, width, goal_y, fill="gray", width=1, dash=(2, 2))
         for i, (day, value) in enumerate(weekly_data.items()):
             x = i * (bar_width + gap) + bar_width / 2
-            bar_height = (value / max_val) * (height - 25)
-            y_top, y_bottom = height - bar_height - 20, height - 20
-            if bar_height > 0: self.canvas.create_line(x, y_bottom, x, y_top, fill=self.habit.color, width=bar_width,
-                                                       capstyle='round')
-            self.canvas.create_text(x, height - 10, text=days[day.weekday()],
-                                    fill=self._apply_appearance_mode(("#6B6B6B", "#9E9E9E")))
+            if (layout, value) != self._shown.get(("bar", i)):
+                bar_height = (value / max_val) * (height - 25)
+                y_top, y_bottom = height - bar_height - 20, height - 20
+                self.canvas.coords(self._bars[i], x, y_bottom, x, y_top)
+                self.canvas.itemconfigure(self._bars[i], state="normal" if bar_height > 0 else "hidden")
+                self._shown[("bar", i)] = (layout, value)
+            if (width, height, day) != self._shown.get(("label", i)):
+                self.canvas.coords(self._labels[i], x, height - 10)
+                self.canvas.itemconfigure(self._labels[i], text=self.DAYS[day.weekday()])
+                self._shown[("label", i)] = (width, height, day)
+        self._shown["layout"], self._shown["color"] = layout, self.habit.color
 
 
 class HabitCard(ctk.CTkFrame):
-    def __init__(self, master, habit: Habit, app):
+    def __init__(self, master, habit: Habit, app, on_toggle=None):
         super().__init__(master, fg_color=("white", "#1C1C1E"), corner_radius=16)
         self.habit, self.app, self.is_expanded = habit, app, False
+        self.on_toggle = on_toggle  # вызывается как on_toggle(card) после сворачивания/разворачивания
         self.main_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.main_frame.pack(fill="x", padx=15, pady=10)
         self.main_frame.grid_columnconfigure(1, weight=1)
@@ -125,6 +242,8 @@ class HabitCard(ctk.CTkFrame):
         icon_label.grid(row=0, column=0, rowspan=2, padx=(0, 15))
         label = ctk.CTkLabel(self.main_frame, text=self.habit.text, font=("SF Pro Display", 17, "bold"), anchor="w");
         label.grid(row=0, column=1, sticky="ew")
+        self.icon_label, self.name_label = icon_label, label
+        self._shown = (self.habit.text, self.habit.icon, self.habit.color)
         progress_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent");
         progress_frame.grid(row=1, column=1, sticky="ew");
         progress_frame.grid_columnconfigure(0, weight=1)
@@ -141,6 +260,8 @@ class HabitCard(ctk.CTkFrame):
                       command=self._open_add_progress).pack(side="right", padx=5)
         card_bg_color = self._apply_appearance_mode(self.cget("fg_color"))
         self.summary_widget = SummaryGraph(self, self.habit, bg_color=card_bg_color)
+        ctk.CTkButton(self.summary_widget, text="История по годам", height=28, fg_color="transparent",
+                      command=self._open_history).pack(pady=(0, 10))
         self.bind("<Button-1>", self.toggle_summary);
         self.main_frame.bind("<Button-1>", self.toggle_summary);
         label.bind("<Button-1>", self.toggle_summary);
@@ -148,10 +269,7 @@ class HabitCard(ctk.CTkFrame):
         self.update_visual_state()
 
     def _load_icon(self, filename, size=(20, 20)):
-        try:
-            return ctk.CTkImage(Image.open(os.path.join(ICONS_PATH, filename)).resize(size))
-        except:
-            return None
+        return icon_cache.get(filename, size)
 
     def _create_icon_label(self, master, icon_file, color):
         icon = self._load_icon(icon_file, size=(28, 28));
@@ -159,21 +277,202 @@ class HabitCard(ctk.CTkFrame):
 
     def toggle_summary(self, event=None):
         if event and any(isinstance(event.widget, c) for c in (ctk.CTkButton, ctk.CTkProgressBar)): return
-        self.is_expanded = not self.is_expanded
+        self.set_expanded(not self.is_expanded)
+        if self.on_toggle: self.on_toggle(self)
+
+    def set_expanded(self, expanded: bool):
+        if expanded == self.is_expanded: return
+        self.is_expanded = expanded
         if self.is_expanded:
             self.summary_widget.pack(fill="x", after=self.main_frame, padx=1, pady=(0, 1))
+            # Данные могли измениться, пока график был скрыт
+            self.after_idle(self.summary_widget.update_graph)
         else:
             self.summary_widget.pack_forget()
 
+    def bind_habit(self, habit: Habit, expanded: bool = False):
+        """Переназначает карточку другой привычке (для виртуального списка)."""
+        self.habit = self.summary_widget.habit = habit
+        self.set_expanded(expanded)
+        self.refresh()
+
     def _open_add_progress(self):
         AddProgressWindow(self, self.habit, self.app._add_progress_to_habit)
 
     def _open_edit_page(self):
         self.app.navigate_to(AddOrEditHabitPage, habit=self.habit)
 
+    def _open_history(self):
+        self.app.navigate_to(HeatmapPage, habit=self.habit)
+
     def update_visual_state(self):
-        self.progress_bar.set(self.habit.get_progress_percent() / 100);
-        self.summary_label.configure(text=self.habit.get_summary_text())
+        _, percent, summary_text = self.app.daily_summary.get(self.habit)
+        self.progress_bar.set(percent / 100);
+        self.summary_label.configure(text=summary_text)
+
+    def refresh(self):
+        """Обновляет карточку после изменения привычки, не пересоздавая виджеты."""
+        shown = (self.habit.text, self.habit.icon, self.habit.color)
+        if shown != self._shown:
+            text, icon, color = shown
+            if text != self._shown[0]: self.name_label.configure(text=text)
+            if icon != self._shown[1]: self.icon_label.configure(image=self._load_icon(icon, size=(28, 28)))
+            if color != self._shown[2]:
+                self.icon_label.configure(fg_color=color);
+                self.progress_bar.configure(progress_color=color)
+            self._shown = shown
+        self.update_visual_state()
+        if self.is_expanded: self.summary_widget.update_graph()
+
+
+class VirtualHabitList(ctk.CTkFrame):
+    """
+    Список привычек, который создаёт карточки только для видимой области.
+    Карточки из пула при прокрутке переназначаются другим привычкам; высоты
+    развёрнутых карточек запоминаются по id привычки.
+    """
+    GAP = 12  # расстояние между карточками, как pady=6 в обычном списке
+
+    def __init__(self, master, app):
+        super().__init__(master, fg_color="transparent")
+        self.app = app
+        self.habits = []
+        self.expanded = set()  # id развёрнутых привычек
+        self.heights = {}  # id -> высота развёрнутой карточки
+        self.row_height = 80  # высота свёрнутой карточки, уточняется по первой показанной
+        self.offsets = [0]
+        self.pool = []  # (карточка, id элемента холста)
+        self.bound = {}  # id привычки -> карточка
+        self._layout_pending = False
+
+        self.canvas = ctk.CTkCanvas(self, highlightthickness=0, bg=self._apply_appearance_mode(("gray92", "black")))
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.canvas.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.canvas)
+
+    def set_habits(self, habits: list[Habit], changed_ids=None, reordered: bool = True):
+        """
+        Задаёт упорядоченный список привычек; changed_ids — изменившиеся (None — все).
+        Если порядок и состав не менялись (reordered=False), смещения не пересчитываются.
+        """
+        if reordered:
+            self.habits = list(habits)
+            present = {h.id for h in habits}
+            self.expanded &= present
+            self.heights = {i: h for i, h in self.heights.items() if i in present}
+            for habit_id in [i for i in self.bound if i not in present]:
+                self.bound.pop(habit_id)
+        for habit_id, card in self.bound.items():
+            if changed_ids is None or habit_id in changed_ids: card.refresh()
+        if reordered:
+            self._update_offsets()
+            self._schedule_layout()
+
+    def _row_height(self, habit_id) -> int:
+        return self.heights.get(habit_id, self.row_height) if habit_id in self.expanded else self.row_height
+
+    def _update_offsets(self):
+        offsets, y = [0], 0
+        for habit in self.habits:
+            y += self._row_height(habit.id) + self.GAP
+            offsets.append(y)
+        self.offsets = offsets
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), y))
+
+    def _schedule_layout(self):
+        if not self._layout_pending:
+            self._layout_pending = True
+            self.after_idle(self._layout)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_layout()
+
+    def _on_resize(self, event):
+        for _, item in self.pool: self.canvas.itemconfigure(item, width=event.width)
+        self._update_offsets()
+        self._schedule_layout()
+
+    @traced("VirtualHabitList._layout")
+    def _layout(self):
+        self._layout_pending = False
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(0, bisect_right(self.offsets, top) - 1)
+        visible = []
+        for i in range(first, len(self.habits)):
+            if self.offsets[i] >= bottom: break
+            visible.append(i)
+
+        visible_ids = {self.habits[i].id for i in visible}
+        self.bound = {i: c for i, c in self.bound.items() if i in visible_ids}
+        free = [card for card, _ in self.pool if card not in self.bound.values()]
+        while len(free) + len(self.bound) < len(visible):
+            free.append(self._create_pooled_card())
+
+        items = {card: item for card, item in self.pool}
+        for i in visible:
+            habit = self.habits[i]
+            card = self.bound.get(habit.id)
+            if card is None:
+                card = self.bound[habit.id] = free.pop()
+                card.bind_habit(habit, habit.id in self.expanded)
+            self.canvas.coords(items[card], 0, self.offsets[i] + self.GAP // 2)
+            self.canvas.itemconfigure(items[card], state="normal")
+        for card in free:
+            self.canvas.itemconfigure(items[card], state="hidden")
+
+        self.canvas.update_idletasks()
+        remeasure = False
+        for card in self.bound.values():
+            remeasure |= self._measure(card)
+        if remeasure:
+            self._update_offsets()
+            self._schedule_layout()
+
+    def _measure(self, card) -> bool:
+        """Запоминает фактическую высоту карточки; True, если раскладку нужно пересчитать."""
+        height = card.winfo_reqheight()
+        if card.is_expanded:
+            changed = self.heights.get(card.habit.id) != height
+            self.heights[card.habit.id] = height
+        else:
+            changed = self.row_height != height
+            self.row_height = height
+        return changed
+
+    def _create_pooled_card(self):
+        card = HabitCard(self.canvas, self.habits[0], self.app, on_toggle=self._on_card_toggle)
+        item = self.canvas.create_window(0, 0, window=card, anchor="nw", width=self.canvas.winfo_width(),
+                                         state="hidden")
+        self.pool.append((card, item))
+        self._bind_wheel(card)
+        return card
+
+    def _on_card_toggle(self, card):
+        if card.is_expanded:
+            self.expanded.add(card.habit.id)
+        else:
+            self.expanded.discard(card.habit.id)
+        card.update_idletasks()
+        self._measure(card)
+        self._update_offsets()
+        self._schedule_layout()
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel, add="+")
+        widget.bind("<Button-4>", self._on_wheel, add="+")
+        widget.bind("<Button-5>", self._on_wheel, add="+")
+        for child in widget.winfo_children(): self._bind_wheel(child)
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.canvas.yview_scroll(-1, "units")
+        else:
+            self.canvas.yview_scroll(1, "units")
 
 
 class HabitListPage(Page):
@@ -187,17 +486,61 @@ class HabitListPage(Page):
         add_button = ctk.CTkButton(header, text="+", width=35,
                                    command=lambda: self.app.navigate_to(AddOrEditHabitPage));
         add_button.pack(side="right", padx=10)
-        self.scroll_frame = ctk.CTkScrollableFrame(self, fg_color="transparent");
-        self.scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.virtual_list = None
+        if VIRTUAL_LIST_MIN_HABITS is not None and len(self.app.habits) >= VIRTUAL_LIST_MIN_HABITS:
+            self.virtual_list = VirtualHabitList(self, self.app)
+            self.virtual_list.pack(fill="both", expand=True, padx=10, pady=10)
+        else:
+            self.scroll_frame = ctk.CTkScrollableFrame(self, fg_color="transparent");
+            self.scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.cards = {}  # habit.id -> HabitCard
+        self._order = []  # id привычек в порядке карточек на экране
+        self._order_version = None  # HabitRepository.order_version, для которого разложены карточки
         self.display_habits()
 
-    def display_habits(self):
-        for widget in self.scroll_frame.winfo_children(): widget.destroy()
-        for habit in sorted(self.app.habits, key=lambda h: h.text): HabitCard(self.scroll_frame, habit, self.app).pack(
-            fill="x", pady=6)
+    def refresh(self, changed_ids=None):
+        self.display_habits(changed_ids)
+
+    @traced("HabitListPage.display_habits")
+    def display_habits(self, changed_ids=None):
+        """
+        Сверяет карточки со списком привычек: создаёт карточки только для новых
+        привычек, удаляет карточки удалённых и обновляет изменившиеся (changed_ids;
+        None — все). Порядок по названию поддерживает HabitRepository; карточки
+        переставляются, только если он изменился.
+        """
+        repository = self.app.habits
+        habits = repository.ordered()
+        reordered = changed_ids is None or repository.order_version != self._order_version
+        self._order_version = repository.order_version
+        if self.virtual_list:
+            self.virtual_list.set_habits(habits, changed_ids, reordered)
+            return
+        if changed_ids is None:
+            present = {h.id for h in habits}
+            for habit_id in [i for i in self.cards if i not in present]:
+                self.cards.pop(habit_id).destroy()
+        for habit in habits if changed_ids is None else filter(None, map(repository.get, changed_ids)):
+            card = self.cards.get(habit.id)
+            if card is None or card.habit is not habit:
+                if card: card.destroy()
+                self.cards[habit.id] = HabitCard(self.scroll_frame, habit, self.app)
+            elif changed_ids is None or habit.id in changed_ids:
+                card.refresh()
+        for habit_id in changed_ids or ():
+            if habit_id not in repository and habit_id in self.cards: self.cards.pop(habit_id).destroy()
+        if not reordered: return
+        order = [h.id for h in habits]
+        if order != self._order:
+            for habit_id in self._order:
+                if habit_id in self.cards: self.cards[habit_id].pack_forget()
+            for habit_id in order: self.cards[habit_id].pack(fill="x", pady=6)
+            self._order = order
 
 
 class AddOrEditHabitPage(Page):
+    cacheable = False  # форма привязана к конкретной привычке
+
     def __init__(self, master, app_controller, habit=None):
         super().__init__(master, app_controller)
         self.habit, self.is_edit_mode = habit, habit is not None
@@ -228,7 +571,7 @@ class AddOrEditHabitPage(Page):
         self.units_entry.grid(row=3, column=1, sticky="ew", pady=(0, 15), padx=(5, 0));
         self.units_entry.bind("<KeyRelease>", self._validate)
         ctk.CTkLabel(main_frame, text="Иконка").grid(row=4, column=0, sticky="w");
-        self.icon_menu = ctk.CTkOptionMenu(main_frame, values=AVAILABLE_ICONS);
+        self.icon_menu = ctk.CTkOptionMenu(main_frame, values=get_available_icons());
         self.icon_menu.grid(row=5, column=0, columnspan=2, sticky="ew", pady=(0, 15))
         ctk.CTkLabel(main_frame, text="Цвет").grid(row=6, column=0, sticky="w");
         self.color_var = ctk.StringVar();
@@ -285,6 +628,8 @@ class StatisticsPage(Page):
         header = ctk.CTkFrame(self, fg_color="transparent");
         header.pack(fill="x", padx=10, pady=(20, 10))
         ctk.CTkButton(header, text="Назад", fg_color="transparent", command=self.app.navigate_back).pack(side="left")
+        ctk.CTkButton(header, text="История", fg_color="transparent",
+                      command=lambda: self.app.navigate_to(HeatmapPage)).pack(side="right")
         ctk.CTkLabel(header, text="Сводка за день", font=("SF Pro Display", 18, "bold")).pack(side="left", expand=True)
         self.canvas_frame = ctk.CTkFrame(self, fg_color="transparent");
         self.canvas_frame.pack(fill="both", expand=True, side="top", padx=20, pady=10)
@@ -293,34 +638,177 @@ class StatisticsPage(Page):
         self.legend_frame.configure(label_font=("SF Pro Display", 14, "bold"))
         self.canvas = ctk.CTkCanvas(self.canvas_frame, highlightthickness=0);
         self.canvas.pack(fill="both", expand=True)
-        self.canvas.bind("<Configure>", self._update_content)
-
+        self.empty_label = ctk.CTkLabel(self.canvas, text="Нет прогресса", text_color="gray")
+        self.arcs = {}  # id привычки -> дуга на холсте
+        self.legend_rows = {}  # id привычки -> виджеты строки легенды
+        self._legend_order = []
+        self._resize_pending = False
+        self.canvas.bind("<Configure>", self._on_configure)
+        self._update_content()
+
+    def refresh(self, changed_ids=None):
+        self._update_content()
+
+    def on_show(self):
+        # Тема могла смениться, пока страница лежала в кэше
+        self.canvas.configure(bg=self._apply_appearance_mode(self.cget("fg_color")))
+        super().on_show()
+
+    def _on_configure(self, event=None):
+        # Изменился только размер: переставляем дуги один раз за цикл простоя
+        if not self._resize_pending:
+            self._resize_pending = True
+            self.after_idle(self._layout_arcs)
+
+    @traced("StatisticsPage._update_content")
     def _update_content(self, event=None):
-        bg_color = self._apply_appearance_mode(self.cget("fg_color"));
-        self.canvas.configure(bg=bg_color)
-        self.canvas.delete("all");
-        [w.destroy() for w in self.legend_frame.winfo_children()]
-        habits = [h for h in self.app.habits if h.get_progress_on(date.today()) > 0]
-        if not habits: ctk.CTkLabel(self.canvas, text="Нет прогресса", text_color="gray").place(relx=0.5, rely=0.5,
-                                                                                                anchor="center"); return
-        total_percent_sum = sum(h.get_progress_percent() for h in habits)
+        """Обновляет дуги и легенду по данным за сегодня, не пересоздавая существующие строки."""
+        self.canvas.configure(bg=self._apply_appearance_mode(self.cget("fg_color")))
+        active = self.app.daily_summary.active(self.app.habits)
+        if active:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, rely=0.5, anchor="center")
+
+        present = {habit.id for habit, _ in active}
+        for habit_id in [i for i in self.legend_rows if i not in present]:
+            self.legend_rows.pop(habit_id)["frame"].destroy()
+            self.canvas.delete(self.arcs.pop(habit_id))
+
+        total_percent_sum = sum(percent for _, percent in active)
         if total_percent_sum == 0: total_percent_sum = 1
-        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
-        if w <= 1 or h <= 1: return
-        size = min(w, h) * 0.7;
-        x0, y0 = (w - size) / 2, (h - size) / 2
         start_angle = 90
-        for habit in habits:
-            percent = habit.get_progress_percent()
+        for habit, percent in active:
             sweep_angle = -(percent / total_percent_sum) * 359.99
-            self.canvas.create_arc(x0, y0, x0 + size, y0 + size, start=start_angle, extent=sweep_angle, style="arc",
-                                   outline=habit.color, width=40)
+            if habit.id not in self.arcs:
+                self.arcs[habit.id] = self.canvas.create_arc(0, 0, 0, 0, style="arc", width=40)
+            self.canvas.itemconfigure(self.arcs[habit.id], start=start_angle, extent=sweep_angle, outline=habit.color)
             start_angle += sweep_angle
+            self._update_legend_row(habit, percent)
+
+        order = [habit.id for habit, _ in active]
+        if order != self._legend_order:
+            for habit_id in order: self.legend_rows[habit_id]["frame"].pack_forget()
+            for habit_id in order: self.legend_rows[habit_id]["frame"].pack(fill="x", pady=5)
+            self._legend_order = order
+        self._layout_arcs()
+
+    def _update_legend_row(self, habit: Habit, percent: float):
+        row = self.legend_rows.get(habit.id)
+        if row is None:
             item_frame = ctk.CTkFrame(self.legend_frame, fg_color="transparent");
-            item_frame.pack(fill="x", pady=5)
-            ctk.CTkFrame(item_frame, width=20, height=20, fg_color=habit.color, corner_radius=6).pack(side="left",
-                                                                                                      padx=10)
-            ctk.CTkLabel(item_frame, text=habit.text, font=("SF Pro Display", 16)).pack(side="left", expand=True,
-                                                                                        anchor="w")
-            ctk.CTkLabel(item_frame, text=f"{percent:.0f}%", font=("SF Pro Display", 16, "bold")).pack(side="right",
-                                                                                                       padx=10)
\ No newline at end of file
+            swatch = ctk.CTkFrame(item_frame, width=20, height=20, fg_color=habit.color, corner_radius=6);
+            swatch.pack(side="left", padx=10)
+            name = ctk.CTkLabel(item_frame, text=habit.text, font=("SF Pro Display", 16));
+            name.pack(side="left", expand=True, anchor="w")
+            value = ctk.CTkLabel(item_frame, text=f"{percent:.0f}%", font=("SF Pro Display", 16, "bold"));
+            value.pack(side="right", padx=10)
+            self.legend_rows[habit.id] = {"frame": item_frame, "swatch": swatch, "name": name, "value": value,
+                                          "shown": (habit.color, habit.text, f"{percent:.0f}%")}
+            return
+        shown = (habit.color, habit.text, f"{percent:.0f}%")
+        if shown[0] != row["shown"][0]: row["swatch"].configure(fg_color=shown[0])
+        if shown[1] != row["shown"][1]: row["name"].configure(text=shown[1])
+        if shown[2] != row["shown"][2]: row["value"].configure(text=shown[2])
+        row["shown"] = shown
+
+    @traced("StatisticsPage._layout_arcs")
+    def _layout_arcs(self):
+        self._resize_pending = False
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if w <= 1 or h <= 1: return
+        size = min(w, h) * 0.7;
+        x0, y0 = (w - size) / 2, (h - size) / 2
+        for arc in self.arcs.values():
+            self.canvas.coords(arc, x0, y0, x0 + size, y0 + size)
+
+
+class HeatmapPage(Page):
+    """
+    Календарь прогресса по годам для привычки habit или для всех привычек сразу.
+    Каждый год — одно изображение из heatmap_cache; недостающие рисуются в фоне.
+    """
+
+    def __init__(self, master, app_controller, habit: Habit = None):
+        super().__init__(master, app_controller)
+        self.habit = habit
+        header = ctk.CTkFrame(self, fg_color="transparent");
+        header.pack(fill="x", padx=10, pady=(20, 10))
+        ctk.CTkButton(header, text="Назад", fg_color="transparent", command=self.app.navigate_back).pack(side="left")
+        title = habit.text if habit else "История всех привычек"
+        ctk.CTkLabel(header, text=title, font=("SF Pro Display", 18, "bold")).pack(side="left", expand=True)
+        self.scroll_frame = ctk.CTkScrollableFrame(self, fg_color="transparent");
+        self.scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.empty_label = ctk.CTkLabel(self.scroll_frame, text="Нет прогресса", text_color="gray")
+        self.rows = {}  # год -> виджеты строки и показанное изображение
+        self._years = []
+        self.refresh()
+
+    def _tile(self):
+        """(id изображения в heatmap_cache, привычки, цвет)"""
+        if self.habit:
+            return self.habit.id, [self.habit], self.habit.color
+        return heatmap_cache.ALL, list(self.app.habits), COLORS["blue"]
+
+    def refresh(self, changed_ids=None):
+        if self.habit and self.habit.id not in self.app.habits: return  # привычку удалили
+        if self.habit and changed_ids is not None and self.habit.id not in changed_ids: return
+        _, habits, _ = self._tile()
+        # Для первого года может понадобиться дочитать историю из хранилища — это делается в фоне
+        executor.submit(self._first_year, habits, key=("heatmap-years", id(self)), on_done=self._show_years)
+
+    @staticmethod
+    def _first_year(habits) -> int | None:
+        days = [day for day in (habit.first_logged_day() for habit in habits) if day]
+        return min(days).year if days else None
+
+    @traced("HeatmapPage._show_years")
+    def _show_years(self, first_year):
+        if not self.winfo_exists(): return
+        years = list(range(clock.today().year, first_year - 1, -1)) if first_year else []
+        if years:
+            self.empty_label.pack_forget()
+        else:
+            self.empty_label.pack(pady=40)
+        for year in [y for y in self.rows if y not in years]:
+            self.rows.pop(year)["frame"].destroy()
+        if years != self._years:
+            for year in years:
+                if year not in self.rows: self._create_row(year)
+                self.rows[year]["frame"].pack_forget()
+            for year in years: self.rows[year]["frame"].pack(fill="x", pady=(0, 12))
+            self._years = years
+
+        tile_id, habits, color = self._tile()
+        theme = ctk.get_appearance_mode()
+        for year in years:
+            image = heatmap_cache.get(tile_id, habits, year, theme, color)
+            if image is not None:
+                self._set_image(year, image)
+            else:
+                self._render(year, tile_id, habits, color, theme)
+
+    def _create_row(self, year: int):
+        frame = ctk.CTkFrame(self.scroll_frame, fg_color="transparent")
+        ctk.CTkLabel(frame, text=str(year), font=("SF Pro Display", 16, "bold"), anchor="w").pack(fill="x", padx=10)
+        image_label = ctk.CTkLabel(frame, text="…", text_color="gray", anchor="w")
+        image_label.pack(fill="x", padx=10, pady=(4, 0))
+        self.rows[year] = {"frame": frame, "image_label": image_label, "image": None, "ctk_image": None}
+
+    def _render(self, year: int, tile_id, habits: list[Habit], color: str, theme: str):
+        revisions = heatmap_cache.revisions(habits)
+
+        def on_done(image):
+            heatmap_cache.put(tile_id, year, theme, revisions, color, image)
+            if self.winfo_exists(): self._set_image(year, image)
+
+        # Значения снимаются здесь, а раскраска и сборка изображения идут в фоне (при настройке — в процессе)
+        executor.submit(render_year, year_values(habits, year), [h.goal for h in habits], year, color, theme,
+                        key=("heatmap", id(self), year), on_done=on_done, process=True)
+
+    def _set_image(self, year: int, image):
+        row = self.rows.get(year)
+        if row is None or row["image"] is image: return
+        row["ctk_image"] = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+        row["image_label"].configure(image=row["ctk_image"], text="")
+        row["image"] = image
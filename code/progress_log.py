@@ -0,0 +1,157 @@
+# progress_log.py
+import math
+from array import array
+from collections.abc import MutableMapping
+from datetime import date
+from settings import PROGRESS_LOG_MODE
+
+
+def _report_bad_entry(key, value, error: Exception):
+    # Одна неверная запись не должна лишать привычку всей истории
+    print(f"Пропущена поврежденная запись прогресса {key!r}: {value!r}. Причина: {error}")
+
+
+class DictProgressLog(dict):
+    """История прогресса в виде обычного словаря {дата ISO: значение}."""
+    __slots__ = ()
+
+    def __init__(self, data: dict = None):
+        super().__init__()
+        for key, value in (data or {}).items():
+            try:
+                day, number = date.fromisoformat(key), float(value)
+                if number != number: raise ValueError("значение NaN")
+            except (TypeError, ValueError) as e:
+                _report_bad_entry(key, value, e)
+                continue
+            self[day.isoformat()] = number
+
+    def value_on(self, day: date, default: float = 0.0) -> float:
+        return self.get(day.isoformat(), default)
+
+    def add(self, day: date, value: float):
+        key = day.isoformat()
+        self[key] = self.get(key, 0.0) + value
+
+    def set_on(self, day: date, value: float):
+        if value != value: raise ValueError("значение NaN")
+        self[day.isoformat()] = value
+
+    def values_between(self, start: date, end: date) -> array:
+        """Значения за дни start..end подряд; дни без записи — NaN."""
+        return array("d", (self.get(date.fromordinal(o).isoformat(), math.nan)
+                           for o in range(start.toordinal(), end.toordinal() + 1)))
+
+    def ordinal_items(self):
+        """Пары (порядковый номер дня, значение) по возрастанию даты."""
+        return sorted((date.fromisoformat(key).toordinal(), value) for key, value in self.items())
+
+    def to_dict(self) -> dict:
+        return dict(self)
+
+    def copy(self):
+        log = DictProgressLog()
+        log.update(self)
+        return log
+
+
+class CompactProgressLog(MutableMapping):
+    """
+    История прогресса в массивах array('d') по CHUNK_DAYS дней, адресуемых
+    порядковым номером дня (date.toordinal). Дни без записи хранятся как NaN.
+    Снаружи ведёт себя как словарь {дата ISO: значение}.
+    """
+    __slots__ = ("_chunks", "_count")
+    CHUNK_DAYS = 256
+    _EMPTY_CHUNK = array("d", [math.nan]) * CHUNK_DAYS
+
+    def __init__(self, data: dict = None):
+        self._chunks = {}
+        self._count = 0
+        if data:
+            for key, value in data.items():
+                try:
+                    self[key] = value
+                except (TypeError, ValueError) as e:
+                    _report_bad_entry(key, value, e)
+
+    def value_on(self, day: date, default: float = 0.0) -> float:
+        index, offset = divmod(day.toordinal(), self.CHUNK_DAYS)
+        chunk = self._chunks.get(index)
+        if chunk is None: return default
+        value = chunk[offset]
+        return default if value != value else value
+
+    def add(self, day: date, value: float):
+        self.set_on(day, self.value_on(day) + value)
+
+    def set_on(self, day: date, value: float):
+        # NaN обозначает пустой день: такая запись была бы невидима, но учтена в len()
+        if value != value: raise ValueError("значение NaN")
+        index, offset = divmod(day.toordinal(), self.CHUNK_DAYS)
+        chunk = self._chunks.get(index)
+        if chunk is None:
+            chunk = self._chunks[index] = array("d", self._EMPTY_CHUNK)
+        if chunk[offset] != chunk[offset]:
+            self._count += 1
+        chunk[offset] = value
+
+    def __getitem__(self, key: str) -> float:
+        value = self.value_on(date.fromisoformat(key), math.nan)
+        if value != value: raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: float):
+        self.set_on(date.fromisoformat(key), float(value))
+
+    def __delitem__(self, key: str):
+        index, offset = divmod(date.fromisoformat(key).toordinal(), self.CHUNK_DAYS)
+        chunk = self._chunks.get(index)
+        if chunk is None or chunk[offset] != chunk[offset]: raise KeyError(key)
+        chunk[offset] = math.nan
+        self._count -= 1
+
+    def __iter__(self):
+        return (date.fromordinal(ordinal).isoformat() for ordinal, _ in self.ordinal_items())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self):
+        return ((date.fromordinal(ordinal).isoformat(), value) for ordinal, value in self.ordinal_items())
+
+    def values_between(self, start: date, end: date) -> array:
+        """Значения за дни start..end подряд; дни без записи — NaN."""
+        first, last = start.toordinal(), end.toordinal()
+        result = array("d")
+        for index in range(first // self.CHUNK_DAYS, last // self.CHUNK_DAYS + 1):
+            base = index * self.CHUNK_DAYS
+            lo, hi = max(first - base, 0), min(last - base, self.CHUNK_DAYS - 1) + 1
+            chunk = self._chunks.get(index)
+            result += chunk[lo:hi] if chunk is not None else self._EMPTY_CHUNK[lo:hi]
+        return result
+
+    def ordinal_items(self):
+        """Пары (порядковый номер дня, значение) по возрастанию даты."""
+        for index in sorted(self._chunks):
+            base = index * self.CHUNK_DAYS
+            for offset, value in enumerate(self._chunks[index]):
+                if value == value:
+                    yield base + offset, value
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def copy(self):
+        """Независимая копия: массивы копируются целиком, без перебора дней."""
+        log = CompactProgressLog()
+        log._chunks = {index: array("d", chunk) for index, chunk in self._chunks.items()}
+        log._count = self._count
+        return log
+
+
+def make_progress_log(data: dict = None):
+    """Создаёт историю прогресса в представлении из settings.PROGRESS_LOG_MODE."""
+    if PROGRESS_LOG_MODE == "compact":
+        return CompactProgressLog(data)
+    return DictProgressLog(data or {})
@@ -0,0 +1,113 @@
+# repository.py
+from bisect import bisect_left
+from models import Habit
+
+
+class HabitRepository:
+    """
+    Все привычки приложения: индекс по id и постоянно отсортированный по
+    названию порядок (вставка и удаление через bisect, без пересортировки).
+
+    При переборе привычки идут в порядке добавления — в нём они сохраняются.
+    Подписчики получают множество id изменившихся привычек, включая
+    добавленные и удалённые; None означает, что заменён весь список.
+    """
+
+    def __init__(self, habits=()):
+        self._by_id = {}  # id -> привычка, в порядке добавления
+        self._keys = []  # отсортированные ключи (название, номер добавления)
+        self._ordered = []  # привычки в порядке _keys
+        self._key_of = {}  # id -> ключ в _keys
+        self._counter = 0
+        self._listeners = []
+        self.order_version = 0  # растёт при каждом изменении порядка по названию
+        for habit in habits:
+            self._insert(habit)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, habit_id) -> bool:
+        return habit_id in self._by_id
+
+    def get(self, habit_id) -> Habit | None:
+        return self._by_id.get(habit_id)
+
+    def ordered(self) -> list[Habit]:
+        """Привычки, отсортированные по названию. Список общий — изменять его нельзя."""
+        return self._ordered
+
+    def index_of(self, habit_id) -> int:
+        """Позиция привычки в порядке по названию."""
+        return bisect_left(self._keys, self._key_of[habit_id])
+
+    def subscribe(self, listener):
+        """listener(changed_ids) вызывается после каждого изменения."""
+        self._listeners.append(listener)
+
+    def notify(self, changed_ids=None):
+        """Сообщает подписчикам об изменении привычек changed_ids (например, прогресса)."""
+        for listener in self._listeners:
+            listener(None if changed_ids is None else set(changed_ids))
+
+    def add(self, habit: Habit) -> Habit:
+        self._insert(habit)
+        self.notify({habit.id})
+        return habit
+
+    def extend(self, habits):
+        """Добавляет несколько привычек с одним уведомлением."""
+        habits = list(habits)
+        for habit in habits:
+            self._insert(habit)
+        if habits: self.notify({habit.id for habit in habits})
+
+    def update(self, habit_id, **fields) -> Habit | None:
+        """Меняет поля привычки; при смене названия переставляет её в порядке."""
+        habit = self._by_id.get(habit_id)
+        if habit is None: return None
+        renamed = "text" in fields and fields["text"] != habit.text
+        if renamed: self._unlink(habit_id)
+        for name, value in fields.items():
+            setattr(habit, name, value)
+        if renamed: self._link(habit, self._key_of[habit_id][1])
+        self.notify({habit_id})
+        return habit
+
+    def remove(self, habit_id) -> Habit | None:
+        habit = self._by_id.pop(habit_id, None)
+        if habit is None: return None
+        self._unlink(habit_id)
+        del self._key_of[habit_id]
+        self.notify({habit_id})
+        return habit
+
+    def replace_all(self, habits):
+        """Заменяет все привычки (например, после загрузки данных)."""
+        self._by_id, self._keys, self._ordered, self._key_of = {}, [], [], {}
+        for habit in habits:
+            self._insert(habit)
+        self.notify(None)
+
+    def _insert(self, habit: Habit):
+        if habit.id in self._by_id:
+            raise ValueError(f"Привычка с id {habit.id} уже есть")
+        self._by_id[habit.id] = habit
+        self._counter += 1
+        self._link(habit, self._counter)
+
+    def _link(self, habit: Habit, number: int):
+        key = self._key_of[habit.id] = (habit.text, number)
+        index = bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._ordered.insert(index, habit)
+        self.order_version += 1
+
+    def _unlink(self, habit_id):
+        index = self.index_of(habit_id)
+        del self._keys[index]
+        del self._ordered[index]
+        self.order_version += 1
@@ -3,7 +3,53 @@ import os
 
 APP_NAME = "Momentum"
 WINDOW_SIZE = "500x750"
+# Хранилище: "json" (DATA_FILE + журнал) или "sqlite" (SQLITE_FILE).
+# При первом запуске с "sqlite" данные переносятся из DATA_FILE.
+STORAGE_BACKEND = "json"
 DATA_FILE = "data.json"
+JOURNAL_FILE = "data.journal"
+SQLITE_FILE = "data.sqlite3"
+
+# Ленивая загрузка истории: при запуске читаются только последние
+# EAGER_HISTORY_DAYS дней, более старые подгружаются при первом обращении.
+# Поддерживается хранилищем "sqlite"; "json" всё равно читает файл целиком.
+LAZY_HISTORY = True
+EAGER_HISTORY_DAYS = 7
+
+# Представление истории прогресса в памяти: "compact" (массивы по дням,
+# см. progress_log.py) или "dict" (словарь {дата ISO: значение}).
+PROGRESS_LOG_MODE = "compact"
+
+# С этого числа привычек список создаёт карточки только для видимой области
+# (см. VirtualHabitList). None — всегда обычный список.
+VIRTUAL_LIST_MIN_HABITS = 50
+
+# Сколько скрытых страниц держать для повторного показа при навигации
+PAGE_CACHE_SIZE = 3
+
+# Инструментовка (см. instrumentation.py): тайминги, счётчики виджетов и окно
+# отладки. Также включается переменной окружения MOMENTUM_TRACE=1.
+INSTRUMENTATION = False
+TRACE_FILE = "momentum_trace.json"
+
+# Журнал прогресса: каждое нажатие "+" дописывает одну строку в JOURNAL_FILE
+# вместо полной перезаписи DATA_FILE. Журнал сворачивается в снимок при
+# запуске и после JOURNAL_COMPACT_THRESHOLD записей.
+USE_PROGRESS_JOURNAL = True
+JOURNAL_COMPACT_THRESHOLD = 500
+
+# Запросы на сохранение в пределах этого окна сливаются в одну запись
+SAVE_DEBOUNCE_MS = 300
+
+# Фоновые задачи (см. executor.py). Один поток ввода-вывода сохраняет порядок
+# записей в хранилище. EXECUTOR_PROCESS_WORKERS > 0 включает пул процессов
+# для тяжёлых расчётов; 0 — они выполняются в отдельном потоке, чтобы не
+# задерживать записи в очереди ввода-вывода.
+EXECUTOR_IO_WORKERS = 1
+EXECUTOR_PROCESS_WORKERS = 0
+
+# Сколько готовых изображений календаря (привычка, год, тема) держать в памяти
+HEATMAP_CACHE_TILES = 64
 
 COLORS = {
     "blue": "#007AFF", "green": "#34C759", "indigo": "#5856D6",
@@ -15,9 +61,24 @@ ERROR_COLOR = "#D32F2F"
 ASSETS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "assets")
 ICONS_PATH = os.path.join(ASSETS_PATH, "icons")
 
-try:
-    AVAILABLE_ICONS = sorted([f for f in os.listdir(ICONS_PATH) if f.endswith('.png')])
-    if not AVAILABLE_ICONS: AVAILABLE_ICONS = ["default.png"]
-except FileNotFoundError:
-    print(f"ВНИМАНИЕ: Папка {ICONS_PATH} не найдена!")
-    AVAILABLE_ICONS = ["default.png"]
\ No newline at end of file
+_available_icons = None
+
+
+def get_available_icons() -> list[str]:
+    """Список иконок; папка читается при первом обращении, а не при импорте."""
+    global _available_icons
+    if _available_icons is None:
+        try:
+            icons = sorted([f for f in os.listdir(ICONS_PATH) if f.endswith('.png')])
+            _available_icons = icons if icons else ["default.png"]
+        except FileNotFoundError:
+            print(f"ВНИМАНИЕ: Папка {ICONS_PATH} не найдена!")
+            _available_icons = ["default.png"]
+    return _available_icons
+
+
+def __getattr__(name):
+    # settings.AVAILABLE_ICONS по-прежнему доступен, но вычисляется лениво
+    if name == "AVAILABLE_ICONS":
+        return get_available_icons()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
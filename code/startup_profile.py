@@ -0,0 +1,60 @@
+# startup_profile.py
+import builtins
+import sys
+import threading
+import time
+
+
+class StartupProfile:
+    """
+    Профиль запуска для флага --profile-startup: время импортов модулей
+    (включая вложенные) и отметки этапов от старта процесса до показа списка.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []  # (этап, секунд от старта)
+        self.imports = []  # [глубина, модуль, секунд]
+        self._local = threading.local()
+        self._original_import = None
+
+    def mark(self, phase: str):
+        self.phases.append((phase, time.perf_counter() - self.started))
+
+    def track_imports(self):
+        """Подменяет __import__, чтобы засекать время первого импорта каждого модуля."""
+        if self._original_import: return
+        original = self._original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules or threading.current_thread() is not threading.main_thread():
+                return original(name, globals, locals, fromlist, level)
+            depth = getattr(self._local, "depth", 0)
+            entry = [depth, name, 0.0]
+            self.imports.append(entry)
+            self._local.depth = depth + 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                entry[2] = time.perf_counter() - start
+                self._local.depth = depth
+
+        builtins.__import__ = timed_import
+
+    def stop(self):
+        if self._original_import:
+            builtins.__import__, self._original_import = self._original_import, None
+
+    def report(self, min_import_ms: float = 1.0):
+        self.stop()
+        print("=== Профиль запуска ===")
+        print("Импорты (мс, включая вложенные):")
+        for depth, name, seconds in self.imports:
+            if seconds * 1000 >= min_import_ms:
+                print(f"  {'  ' * depth}{name}: {seconds * 1000:.1f}")
+        print("Этапы (мс от старта):")
+        previous = 0.0
+        for phase, seconds in self.phases:
+            print(f"  {phase}: {seconds * 1000:.1f} (+{(seconds - previous) * 1000:.1f})")
+            previous = seconds
@@ -0,0 +1,488 @@
+# storage.py
+import glob
+import json
+import math
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+from executor import executor
+from instrumentation import traced
+from models import Habit
+from settings import (DATA_FILE, JOURNAL_FILE, SQLITE_FILE, USE_PROGRESS_JOURNAL, JOURNAL_COMPACT_THRESHOLD,
+                      SAVE_DEBOUNCE_MS)
+
+
+def validate_habit_data(habit_data: dict) -> str | None:
+    """Возвращает причину, по которой запись о привычке нельзя загрузить, или None."""
+    goal = habit_data.get("goal")
+    if not isinstance(goal, (int, float)) or not math.isfinite(goal) or goal <= 0:
+        return f"Пропущена привычка с неверной целью: {habit_data.get('text')}"
+    if not all(key in habit_data for key in ["text", "units", "goal"]):
+        return f"Пропущена привычка с отсутствующими полями: {habit_data.get('text')}"
+    return None
+
+
+def habits_from_records(records) -> list[Habit]:
+    valid_habits = []
+    for habit_data in records:
+        try:
+            error = validate_habit_data(habit_data)
+            if error:
+                print(error)
+                continue
+            valid_habits.append(Habit.from_dict(habit_data))
+        except (TypeError, KeyError, ValueError, AttributeError) as e:
+            print(f"Пропущена поврежденная запись о привычке: {habit_data}. Причина: {e}")
+    return valid_habits
+
+
+class Storage:
+    """
+    Интерфейс хранилища привычек. Реализации выбираются через settings.STORAGE_BACKEND.
+    Записи, которые не должны задерживать интерфейс, ставятся в executor через _submit().
+    """
+    _queued = ()
+
+    def load_habits(self, history_since: date = None) -> list[Habit]:
+        """
+        Загружает привычки. Если задан history_since, хранилище может загрузить
+        только прогресс начиная с этой даты, а остальное отложить (Habit.defer_history).
+        """
+        raise NotImplementedError
+
+    def save_habits(self, habits: list[Habit]):
+        """Синхронно сохраняет все привычки вместе с историей."""
+        raise NotImplementedError
+
+    def request_save(self, habits: list[Habit]):
+        """Сохраняет изменения в списке привычек (добавление, правка, удаление)."""
+        self.save_habits(habits)
+
+    def save_progress(self, habits: list[Habit], habit: Habit, on_date: date):
+        """Сохраняет прогресс одной привычки за один день."""
+        self.request_save(habits)
+
+    def load_progress_range(self, habit_id: str, start: date, end: date) -> dict | None:
+        """
+        Возвращает прогресс привычки за дни start..end включительно, не загружая
+        остальную историю. None означает, что хранилище так не умеет.
+        """
+        return None
+
+    def flush(self):
+        """Дожидается записи всех отложенных изменений."""
+        self._wait_queued()
+
+    def _submit(self, fn, *args, key=None):
+        """Ставит запись в фоновую очередь; данные для неё уже сняты в вызывающем потоке."""
+        self._queued = [task for task in self._queued if not task.done()]
+        self._queued.append(executor.submit(fn, *args, key=key))
+        return self._queued[-1]
+
+    def _wait_queued(self):
+        executor.wait(self._queued)
+        self._queued = []
+
+
+class JsonStorage(Storage):
+    """
+    Снимок в DATA_FILE плюс журнал прогресса JOURNAL_FILE.
+
+    Каждая запись журнала хранит итоговое значение за день (а не прибавку),
+    поэтому повторное применение журнала к снимку безопасно. Снимок пишется
+    во временный файл и атомарно подменяет DATA_FILE.
+
+    Снимок хранит номер поколения: отложенный журнал JOURNAL_FILE.<N> с N не
+    больше него уже вошёл в снимок и при загрузке не применяется.
+    """
+
+    def __init__(self, data_file: str = DATA_FILE, journal_file: str = JOURNAL_FILE):
+        self.data_file, self.journal_file = data_file, journal_file
+        self._lock = threading.Lock()  # журнал, счётчики поколений
+        self._write_lock = threading.Lock()  # запись снимка
+        self._generation = 0
+        self._written_generation = 0
+        self._journal_size = 0
+        self._pending = None  # (поколение, данные, журналы) ожидающего сохранения
+        self._timer = None
+
+    def save_habits(self, habits: list[Habit]):
+        """Синхронно записывает полный снимок и сбрасывает журнал."""
+        self._wait_queued()  # иначе запоздавшая строка журнала перекроет снимок
+        with self._lock:
+            generation, payload, rotated = self._capture(habits)
+        self._write_snapshot(generation, payload, rotated)
+
+    def request_save(self, habits: list[Habit]):
+        """
+        Планирует запись снимка в фоновом потоке. Все запросы в пределах
+        SAVE_DEBOUNCE_MS сливаются в одну запись последнего состояния.
+        """
+        with self._lock:
+            generation, payload, rotated = self._capture(habits)
+            if self._pending:
+                rotated = self._pending[2] + rotated
+            self._pending = (generation, payload, rotated)
+            if self._timer is None:
+                self._timer = threading.Timer(SAVE_DEBOUNCE_MS / 1000, self._write_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def save_progress(self, habits: list[Habit], habit: Habit, on_date: date):
+        if not USE_PROGRESS_JOURNAL:
+            self.request_save(habits)
+            return
+        # Одна строка в журнал вместо перезаписи всей истории; дописывается в фоне
+        line = self._journal_line(habit, on_date)
+        with self._lock:
+            self._journal_size += 1
+        self._submit(self._append_line, line)
+        if self.needs_compaction():
+            self.compact(habits)
+
+    def flush(self):
+        """Немедленно записывает отложенное сохранение и дожидается текущих записей."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = None
+            pending, self._pending = self._pending, None
+        self._wait_queued()
+        if pending:
+            self._write_snapshot(*pending)
+        else:
+            with self._write_lock:
+                pass
+
+    def compact(self, habits: list[Habit], stale_journals: list[str] = ()):
+        """Сворачивает журнал в снимок в фоновом потоке."""
+        with self._lock:
+            generation, payload, rotated = self._capture(habits)
+        rotated += stale_journals
+        self._submit(self._write_snapshot, generation, payload, rotated)
+
+    @staticmethod
+    def _journal_line(habit: Habit, on_date: date) -> str:
+        record = {"id": habit.id, "date": on_date.isoformat(), "value": habit.get_progress_on(on_date)}
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _append_line(self, line: str):
+        with self._lock:
+            try:
+                with open(self.journal_file, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except IOError as e:
+                print(f"Критическая ошибка: Не удалось записать прогресс в {self.journal_file}. Причина: {e}")
+
+    def needs_compaction(self) -> bool:
+        return self._journal_size >= JOURNAL_COMPACT_THRESHOLD
+
+    def _write_pending(self):
+        with self._lock:
+            self._timer = None
+            pending, self._pending = self._pending, None
+        if pending:
+            self._write_snapshot(*pending)
+
+    def _capture(self, habits: list[Habit]):
+        """
+        Копирует данные для снимка и откладывает текущий журнал в сторону.
+        Вызывается под _lock, чтобы снимок и журнал были согласованы.
+        """
+        self._generation += 1
+        payload = [h.snapshot() for h in habits]  # копии массивов; to_dict — в потоке записи
+        rotated = []
+        if os.path.exists(self.journal_file):
+            path = f"{self.journal_file}.{self._generation}"
+            try:
+                os.replace(self.journal_file, path)
+                rotated.append(path)
+            except OSError as e:
+                print(f"Ошибка: Не удалось переименовать {self.journal_file}. Причина: {e}")
+        self._journal_size = 0
+        return self._generation, payload, rotated
+
+    @traced("JsonStorage.write_snapshot")
+    def _write_snapshot(self, generation: int, payload: list, rotated: list[str]):
+        with self._write_lock:
+            # Более новый снимок уже записан и содержит всё из этого журнала
+            if generation > self._written_generation:
+                try:
+                    self._atomic_write(self.data_file,
+                                       {"generation": generation, "habits": [h.to_dict() for h in payload]})
+                except (IOError, OSError) as e:
+                    print(f"Критическая ошибка: Не удалось сохранить данные в {self.data_file}. Причина: {e}")
+                    return
+                self._written_generation = generation
+            self._remove_journals(rotated)
+
+    @staticmethod
+    def _remove_journals(paths: list[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Не страшно: журнал старше снимка при загрузке пропускается
+                print(f"Ошибка: Не удалось удалить журнал {path}. Причина: {e}")
+
+    @staticmethod
+    def _atomic_write(path: str, payload: dict):
+        """Пишет во временный файл, сбрасывает его на диск и подменяет им path."""
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if hasattr(os, "O_DIRECTORY"):
+            # На POSIX переименование надёжно только после fsync каталога
+            dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _rotated_journals(self) -> list[tuple[int, str]]:
+        """Отложенные журналы, оставшиеся от незавершённого сворачивания."""
+        rotated = []
+        for path in glob.glob(f"{glob.escape(self.journal_file)}.*"):
+            suffix = path.rsplit(".", 1)[-1]
+            if suffix.isdigit(): rotated.append((int(suffix), path))
+        return sorted(rotated)
+
+    @staticmethod
+    def _replay_journal(habits: list[Habit], paths: list[str]) -> int:
+        """Применяет записи журналов к загруженным привычкам по порядку."""
+        habits_by_id = {h.id: h for h in habits}
+        replayed = 0
+        for path in paths:
+            if not os.path.exists(path): continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line_no, line in enumerate(f, 1):
+                        if not line.strip(): continue
+                        try:
+                            record = json.loads(line)
+                            habit = habits_by_id.get(record["id"])
+                            value = record["value"]
+                            date.fromisoformat(record["date"])
+                            if not isinstance(value, (int, float)) or value != value: raise ValueError(value)
+                        except (ValueError, KeyError, TypeError) as e:
+                            # Обычно это недописанная последняя строка после сбоя
+                            print(f"Пропущена поврежденная запись журнала {path}:{line_no}. Причина: {e}")
+                            continue
+                        if habit:
+                            habit.set_progress(date.fromisoformat(record["date"]), float(value))
+                        replayed += 1
+            except IOError as e:
+                print(f"Ошибка: Не удалось прочитать журнал {path}. Причина: {e}")
+        return replayed
+
+    def load_habits(self, history_since: date = None) -> list[Habit]:
+        # Один JSON-файл всё равно разбирается целиком, поэтому history_since не используется
+        valid_habits = []
+        generation = 0  # прежний формат снимка — просто список привычек, без поколения
+        if os.path.exists(self.data_file):
+            try:
+                with open(self.data_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    if isinstance(data, dict):
+                        generation, data = data.get("generation"), data.get("habits")
+                    if not isinstance(data, list) or not isinstance(generation, int):
+                        print(f"Ошибка: {self.data_file} содержит неверный формат данных (не список).")
+                        return []
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"Критическая ошибка: Не удалось прочитать или декодировать {self.data_file}. Причина: {e}")
+                return []
+            valid_habits = habits_from_records(data)
+
+        rotated = self._rotated_journals()
+        # Новые журналы получают номера больше всех уже использованных
+        self._generation = self._written_generation = max([generation] + [n for n, _ in rotated])
+        # Журналы не новее снимка уже в нём; их повторное применение откатило бы прогресс
+        self._remove_journals([path for n, path in rotated if n <= generation])
+        stale = [path for n, path in rotated if n > generation]
+        if self._replay_journal(valid_habits, stale + [self.journal_file]) or stale:
+            # Все записи журналов теперь в памяти: переносим их в снимок
+            self.compact(valid_habits, stale)
+        return valid_habits
+
+
+class SqliteStorage(Storage):
+    """
+    Хранилище в SQLite: таблица habits и таблица progress(habit_id, day, value)
+    с первичным ключом (habit_id, day). Прогресс за день сохраняется одним UPSERT,
+    а выборка по диапазону дней идёт по индексу.
+    """
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_file: str = SQLITE_FILE, migrate_from: str = DATA_FILE):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._sync_task = None  # последняя поставленная синхронизация привычек
+        self._sync_series = 0
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+            self._create_schema()
+            if migrate_from and os.path.exists(migrate_from):
+                migrate_json_to_sqlite(migrate_from, storage=self)
+            # Версия ставится после переноса, чтобы прерванный перенос повторился
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS habits (
+                    id TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    goal REAL NOT NULL,
+                    units TEXT NOT NULL,
+                    color TEXT,
+                    icon TEXT,
+                    stats TEXT
+                );
+                CREATE TABLE IF NOT EXISTS progress (
+                    habit_id TEXT NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+                    day TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (habit_id, day)
+                ) WITHOUT ROWID;
+            """)
+
+    def load_habits(self, history_since: date = None) -> list[Habit]:
+        try:
+            with self._lock:
+                habit_rows = self._conn.execute(
+                    "SELECT id, text, goal, units, color, icon, stats FROM habits ORDER BY position").fetchall()
+                if history_since is None:
+                    progress_rows = self._conn.execute("SELECT habit_id, day, value FROM progress").fetchall()
+                else:
+                    # По одному запросу на привычку, чтобы читать только окно по индексу (habit_id, day)
+                    progress_rows = []
+                    for row in habit_rows:
+                        progress_rows += self._conn.execute(
+                            "SELECT habit_id, day, value FROM progress WHERE habit_id = ? AND day >= ?",
+                            (row[0], history_since.isoformat())).fetchall()
+        except sqlite3.Error as e:
+            print(f"Критическая ошибка: Не удалось прочитать {self.db_file}. Причина: {e}")
+            return []
+        logs = {}
+        for habit_id, day, value in progress_rows:
+            logs.setdefault(habit_id, {})[day] = value
+        habits = habits_from_records(
+            {"id": row[0], "text": row[1], "goal": row[2], "units": row[3], "color": row[4], "icon": row[5],
+             "progress_log": logs.get(row[0], {}), "stats": json.loads(row[6]) if row[6] else None}
+            for row in habit_rows)
+        if history_since is not None:
+            older_until = history_since - timedelta(days=1)
+            for habit in habits:
+                habit.defer_history(
+                    lambda habit_id=habit.id: self.load_progress_range(habit_id, date.min, older_until),
+                    history_since)
+        return habits
+
+    def save_habits(self, habits: list[Habit]):
+        self._wait_queued()
+        # Строки прогресса собираются до блокировки: чтение отложенной истории само берёт _lock
+        progress_rows = [(h.id, day, value) for h in habits for day, value in h.progress_log.items()]
+        self._write(self._habit_rows(habits), progress_rows)
+
+    def request_save(self, habits: list[Habit]):
+        # Прогресс уже лежит в базе построчно, достаточно синхронизировать сами привычки.
+        # Более новый запрос заменяет ещё не начатую запись, но только если после неё
+        # ничего не поставлено: записи прогресса могут ссылаться на добавленную в ней привычку.
+        if not self._queued or self._queued[-1] is not self._sync_task:
+            self._sync_series += 1
+        self._sync_task = self._submit(self._write, self._habit_rows(habits), None,
+                                       key=("sqlite-habits", self.db_file, self._sync_series))
+
+    def save_progress(self, habits: list[Habit], habit: Habit, on_date: date):
+        self._submit(self._write_progress, habit.id, on_date.isoformat(), habit.get_progress_on(on_date),
+                     json.dumps(habit.stats.to_dict()))
+
+    def _write_progress(self, habit_id: str, day: str, value: float, stats: str):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO progress (habit_id, day, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (habit_id, day) DO UPDATE SET value = excluded.value",
+                    (habit_id, day, value))
+                self._conn.execute("UPDATE habits SET stats = ? WHERE id = ?", (stats, habit_id))
+        except sqlite3.Error as e:
+            print(f"Критическая ошибка: Не удалось сохранить прогресс в {self.db_file}. Причина: {e}")
+
+    def load_progress_range(self, habit_id: str, start: date, end: date) -> dict | None:
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT day, value FROM progress WHERE habit_id = ? AND day BETWEEN ? AND ?",
+                    (habit_id, start.isoformat(), end.isoformat())).fetchall()
+        except sqlite3.Error as e:
+            print(f"Ошибка: Не удалось прочитать прогресс из {self.db_file}. Причина: {e}")
+            return None
+        return dict(rows)
+
+    @staticmethod
+    def _habit_rows(habits: list[Habit]) -> list[tuple]:
+        return [(h.id, i, h.text, h.goal, h.units, h.color, h.icon, json.dumps(h.stats.to_dict()))
+                for i, h in enumerate(habits)]
+
+    def _write(self, rows: list[tuple], progress_rows: list[tuple] = None):
+        """Синхронизирует строки привычек; если переданы progress_rows, записывает и прогресс."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS kept_ids (id TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM kept_ids")
+                self._conn.executemany("INSERT INTO kept_ids (id) VALUES (?)", ((row[0],) for row in rows))
+                self._conn.execute("DELETE FROM habits WHERE id NOT IN (SELECT id FROM kept_ids)")
+                self._conn.executemany(
+                    "INSERT INTO habits (id, position, text, goal, units, color, icon, stats) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET position = excluded.position, text = excluded.text, "
+                    "goal = excluded.goal, units = excluded.units, color = excluded.color, icon = excluded.icon, "
+                    "stats = excluded.stats",
+                    rows)
+                if progress_rows is not None:
+                    self._conn.executemany(
+                        "INSERT INTO progress (habit_id, day, value) VALUES (?, ?, ?) "
+                        "ON CONFLICT (habit_id, day) DO UPDATE SET value = excluded.value",
+                        progress_rows)
+        except sqlite3.Error as e:
+            print(f"Критическая ошибка: Не удалось сохранить данные в {self.db_file}. Причина: {e}")
+
+
+def migrate_json_to_sqlite(json_file: str = DATA_FILE, db_file: str = SQLITE_FILE, journal_file: str = JOURNAL_FILE,
+                           storage: SqliteStorage = None) -> int:
+    """
+    Однократно переносит привычки из data.json (вместе с журналом прогресса)
+    в базу SQLite. Исходные файлы не удаляются. Возвращает число привычек.
+    """
+    source = JsonStorage(json_file, journal_file)
+    habits = source.load_habits()
+    source.flush()
+    target = storage or SqliteStorage(db_file, migrate_from=None)
+    target.save_habits(habits)
+    print(f"Перенесено привычек из {json_file} в {target.db_file}: {len(habits)}")
+    return len(habits)
+
+
+def create_storage(backend: str) -> Storage:
+    if backend == "sqlite":
+        return SqliteStorage()
+    if backend != "json":
+        print(f"Неизвестное хранилище '{backend}', используется json.")
+    return JsonStorage()
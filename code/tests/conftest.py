@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Модули приложения лежат плоско в code/ и импортируются без пакета
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,302 @@
+# tests/test_data_invariants.py
+"""
+Инварианты данных: журнал и снимки JsonStorage, порядок записей SqliteStorage,
+показатели HabitStats, семантика объединения при импорте и векторная аналитика.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+
+import models
+import storage
+import transfer
+from executor import executor
+from models import Habit, HabitStats
+from progress_log import CompactProgressLog, DictProgressLog
+from storage import JsonStorage, SqliteStorage
+
+DAY = date(2024, 3, 10)
+
+
+def make_habit(habit_id="h1", goal=2.0, log=None, text="Бег"):
+    return Habit(text, goal, "км", color="#000000", icon="default.png", progress_log=log, habit_id=habit_id)
+
+
+@pytest.fixture(params=[DictProgressLog, CompactProgressLog], ids=["dict", "compact"])
+def log_class(request, monkeypatch):
+    monkeypatch.setattr(models, "make_progress_log", lambda data=None: request.param(data))
+    return request.param
+
+
+@pytest.fixture
+def json_paths(tmp_path):
+    return str(tmp_path / "data.json"), str(tmp_path / "data.journal")
+
+
+# --- Журнал и снимки -------------------------------------------------------
+
+def test_journal_stores_day_totals_and_replay_is_idempotent(json_paths):
+    s = JsonStorage(*json_paths)
+    habit = make_habit()
+    s.save_habits([habit])
+    for value in (1.0, 2.0):
+        habit.add_progress(value, DAY)
+        s.save_progress([habit], habit, DAY)
+    s.flush()
+    for _ in range(2):  # вторая загрузка читает уже свёрнутый снимок
+        reader = JsonStorage(*json_paths)
+        loaded = reader.load_habits()
+        reader.flush()
+        assert loaded[0].get_progress_on(DAY) == 3.0
+
+
+def test_rotated_journal_older_than_snapshot_is_not_replayed(json_paths):
+    data_file, journal_file = json_paths
+    s = JsonStorage(*json_paths)
+    habit = make_habit()
+    habit.set_progress(DAY, 3.0)
+    s.save_habits([habit])
+    s.save_progress([habit], habit, DAY)
+    s.flush()
+    with open(journal_file, encoding="utf-8") as f:
+        stale_line = f.read()
+    habit.set_progress(DAY, 5.0)
+    s.save_progress([habit], habit, DAY)
+    s.save_habits([habit])
+    s.flush()
+    generation = json.load(open(data_file, encoding="utf-8"))["generation"]
+    # Журнал, который не удалось удалить после записи снимка
+    with open(f"{journal_file}.{generation}", "w", encoding="utf-8") as f:
+        f.write(stale_line)
+
+    reader = JsonStorage(*json_paths)
+    loaded = reader.load_habits()
+    reader.flush()
+    assert loaded[0].get_progress_on(DAY) == 5.0
+    assert not os.path.exists(f"{journal_file}.{generation}")
+
+
+def test_rotated_journal_newer_than_snapshot_is_replayed(json_paths):
+    data_file, journal_file = json_paths
+    s = JsonStorage(*json_paths)
+    habit = make_habit()
+    s.save_habits([habit])
+    habit.set_progress(DAY, 4.0)
+    s.save_progress([habit], habit, DAY)
+    s.flush()
+    # Журнал отложен, но снимок следующего поколения так и не записан (сбой)
+    generation = json.load(open(data_file, encoding="utf-8"))["generation"]
+    os.replace(journal_file, f"{journal_file}.{generation + 1}")
+
+    reader = JsonStorage(*json_paths)
+    loaded = reader.load_habits()
+    reader.flush()
+    assert loaded[0].get_progress_on(DAY) == 4.0
+
+
+def test_compaction_keeps_progress_written_after_it(json_paths, monkeypatch):
+    monkeypatch.setattr(storage, "JOURNAL_COMPACT_THRESHOLD", 3)
+    s = JsonStorage(*json_paths)
+    habit = make_habit()
+    s.save_habits([habit])
+    for offset in range(8):
+        day = DAY + timedelta(days=offset)
+        habit.set_progress(day, float(offset + 1))
+        s.save_progress([habit], habit, day)
+    s.flush()
+
+    reader = JsonStorage(*json_paths)
+    loaded = reader.load_habits()
+    reader.flush()
+    assert loaded[0].progress_log.to_dict() == habit.progress_log.to_dict()
+
+
+def test_old_list_snapshot_still_loads(json_paths):
+    data_file, _ = json_paths
+    habit = make_habit(log={DAY.isoformat(): 2.0})
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump([habit.to_dict()], f)
+    loaded = JsonStorage(*json_paths).load_habits()
+    assert loaded[0].get_progress_on(DAY) == 2.0
+
+
+# --- SQLite ----------------------------------------------------------------
+
+def test_sqlite_save_with_deferred_history_does_not_deadlock(tmp_path):
+    db_file = str(tmp_path / "habits.sqlite3")
+    writer = SqliteStorage(db_file, migrate_from=None)
+    writer.save_habits([make_habit(log={(DAY - timedelta(days=i)).isoformat(): 1.0 for i in range(30)})])
+    writer.flush()
+
+    reader = SqliteStorage(db_file, migrate_from=None)
+    lazy = reader.load_habits(history_since=DAY - timedelta(days=6))
+    saver = threading.Thread(target=reader.save_habits, args=(lazy,), daemon=True)
+    saver.start()
+    saver.join(timeout=5)
+    assert not saver.is_alive()
+    assert len(SqliteStorage(db_file, migrate_from=None).load_habits()[0].progress_log) == 30
+
+
+def test_sqlite_progress_is_not_reordered_before_its_habit_row(tmp_path):
+    db_file = str(tmp_path / "habits.sqlite3")
+    s = SqliteStorage(db_file, migrate_from=None)
+    first = make_habit("h1")
+    habits = [first]
+    gate = threading.Event()
+    executor.submit(gate.wait)  # занимает поток записи, чтобы задачи копились в очереди
+    try:
+        added = make_habit("h2", text="Чтение")
+        habits.append(added)
+        s.request_save(habits)
+        added.set_progress(DAY, 3.0)
+        s.save_progress(habits, added, DAY)
+        first.text = "Плавание"
+        s.request_save(habits)
+    finally:
+        gate.set()
+    s.flush()
+    loaded = {h.id: h for h in SqliteStorage(db_file, migrate_from=None).load_habits()}
+    assert loaded["h2"].get_progress_on(DAY) == 3.0
+    assert loaded["h1"].text == "Плавание"
+
+
+# --- Показатели HabitStats -------------------------------------------------
+
+def test_stats_do_not_drift_after_past_day_edits_and_goal_changes(log_class):
+    rng = random.Random(7)
+    habit = make_habit(goal=2.0)
+    for _ in range(400):
+        day = DAY - timedelta(days=rng.randrange(60))
+        action = rng.random()
+        if action < 0.45:
+            habit.set_progress(day, float(rng.randint(0, 4)))
+        elif action < 0.9:
+            habit.add_progress(float(rng.randint(-1, 3)), day)
+        else:
+            habit.goal = float(rng.randint(1, 4))
+        assert habit.verify_stats() == {}
+
+
+def test_stats_survive_storage_round_trip(json_paths):
+    habit = make_habit(log={(DAY - timedelta(days=i)).isoformat(): 2.0 for i in range(5)})
+    s = JsonStorage(*json_paths)
+    s.save_habits([habit])
+    loaded = JsonStorage(*json_paths).load_habits()[0]
+    assert loaded.stats.diff(HabitStats.rebuild(loaded.progress_log, loaded.goal)) == {}
+    assert loaded.stats.longest_streak == 5
+
+
+# --- История прогресса -----------------------------------------------------
+
+def test_progress_logs_skip_malformed_entries(log_class):
+    log = log_class({"2024-01-02T08:00": 1.0, "2024-01-03": 2.0, "x": 1.0, "2024-01-04": "nan"})
+    assert log.to_dict() == {"2024-01-03": 2.0}
+    assert list(log.ordinal_items()) == [(date(2024, 1, 3).toordinal(), 2.0)]
+
+
+def test_progress_logs_reject_nan(log_class):
+    log = log_class({"2024-01-03": 2.0})
+    with pytest.raises(ValueError):
+        log.set_on(date(2024, 1, 4), math.nan)
+    assert len(log) == len(list(log.items())) == 1
+
+
+# --- Импорт ----------------------------------------------------------------
+
+def write_csv(path, rows, tail: bytes = b""):
+    with open(path, "wb") as f:
+        f.write((",".join(transfer.FIELDS) + "\n").encode())
+        for row in rows:
+            f.write((",".join(str(row.get(field, "")) for field in transfer.FIELDS) + "\n").encode())
+        f.write(tail)
+
+
+@pytest.mark.parametrize("merge, expected", [("sum", 7.0), ("replace", 1.0)])
+def test_import_merge_modes(tmp_path, merge, expected):
+    habit = make_habit(log={DAY.isoformat(): 5.0})
+    path = str(tmp_path / "import.csv")
+    write_csv(path, [{"habit_id": "h1", "day": DAY.isoformat(), "value": 1}] * 2)
+    report = transfer.import_progress([habit], path, merge=merge)
+    assert (report.imported, report.skipped) == (2, 0)
+    assert habit.get_progress_on(DAY) == expected
+    assert habit.verify_stats() == {}
+
+
+def test_sum_import_waits_for_history_loaded_in_background():
+    habit = make_habit(log={(DAY + timedelta(days=30)).isoformat(): 1.0})
+
+    def slow_loader():
+        time.sleep(0.2)
+        return {DAY.isoformat(): 5.0}
+
+    habit.defer_history(slow_loader, DAY + timedelta(days=1))
+    worker = threading.Thread(target=habit.get_progress_on, args=(DAY - timedelta(days=1),))
+    worker.start()
+    time.sleep(0.05)  # фоновая загрузка уже идёт
+    assert habit.get_progress_on(DAY) == 5.0
+    habit.merge_progress([(DAY, 2.0)])
+    worker.join()
+    assert habit.get_progress_on(DAY) == 7.0
+
+
+def test_import_creates_habits_and_rejects_non_finite_goals(tmp_path):
+    path = str(tmp_path / "import.csv")
+    write_csv(path, [
+        {"text": "Новая", "goal": 3, "units": "раз", "day": DAY.isoformat(), "value": 2},
+        {"text": "Плохая", "goal": "nan", "units": "раз", "day": DAY.isoformat(), "value": 2},
+        {"text": "Новая", "goal": 3, "units": "раз", "day": DAY.isoformat(), "value": "inf"},
+    ])
+    report = transfer.import_progress([], path)
+    assert [habit.text for habit in report.created] == ["Новая"]
+    assert report.created[0].get_progress_on(DAY) == 2.0
+    assert [line for line, _ in report.errors] == [3, 4]
+
+
+def test_import_reports_undecodable_file_and_keeps_read_batches(tmp_path):
+    habit = make_habit()
+    path = str(tmp_path / "import.csv")
+    rows = [{"habit_id": "h1", "day": (DAY + timedelta(days=i)).isoformat(), "value": 1} for i in range(5000)]
+    write_csv(path, rows, tail=b"h1,,,,,,2030-01-01,\xff\xfe\n")
+    report = transfer.import_progress([habit], path, batch_size=1000)
+    assert report.errors and "дочитать" in report.errors[-1][1]
+    assert report.imported == len(habit.progress_log) > 0
+    assert report.touched == {"h1"}
+
+
+# --- Аналитика -------------------------------------------------------------
+
+def test_analytics_matches_per_day_loop():
+    np = pytest.importorskip("numpy")
+    from analytics import HabitAnalytics
+
+    rng = random.Random(3)
+    start, end = DAY - timedelta(days=120), DAY
+    habits = [make_habit(f"h{i}", goal=goal,
+                         log={(start + timedelta(days=d)).isoformat(): float(rng.randint(0, 4))
+                              for d in range(121) if rng.random() < 0.7})
+              for i, goal in enumerate([1.0, 2.0, 3.0])]
+    analytics = HabitAnalytics(habits, end=end, start=start)
+
+    for j, habit in enumerate(habits):
+        run = longest = 0
+        runs = []
+        for d in range(121):
+            run = run + 1 if habit.is_completed_on(start + timedelta(days=d)) else 0
+            longest = max(longest, run)
+            runs.append(run)
+        current = runs[-1] if habit.is_completed_on(end) else runs[-2]
+        assert analytics.longest_streaks()[j] == longest
+        assert analytics.current_streaks()[j] == current
+
+        labels, rates = analytics.completion_rates("week")
+        for i, week_start in enumerate(labels):
+            days = [week_start + timedelta(days=k) for k in range(7)]
+            days = [day for day in days if start <= day <= end]
+            expected = sum(habit.is_completed_on(day) for day in days) / len(days)
+            assert np.isclose(rates[i, j], expected)
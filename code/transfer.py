@@ -0,0 +1,194 @@
+# transfer.py
+import csv
+import io
+import json
+import math
+import os
+from datetime import date
+from models import Habit
+from storage import validate_habit_data
+
+FIELDS = ["habit_id", "text", "goal", "units", "color", "icon", "day", "value"]
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+MERGE_MODES = ("sum", "replace")
+IMPORT_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    """Итог импорта: сколько строк прочитано и принято, какие привычки созданы и ошибки по строкам."""
+    __slots__ = ("rows", "imported", "skipped", "created", "touched", "errors")
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.skipped = 0
+        self.created = []  # новые привычки; в список привычек их добавляет вызывающий
+        self.touched = set()  # id привычек, в которые внесён прогресс
+        self.errors = []  # (номер строки, причина); хранится не больше MAX_REPORTED_ERRORS
+
+    def add_error(self, line: int, reason: str):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, reason))
+
+    def __repr__(self):
+        return (f"ImportReport(rows={self.rows}, imported={self.imported}, skipped={self.skipped}, "
+                f"created={len(self.created)})")
+
+
+def detect_format(path: str) -> str:
+    """Формат файла по расширению: "csv" или "jsonl"."""
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Неизвестный формат файла: {path}. Поддерживаются {', '.join(FORMATS)}")
+    return fmt
+
+
+def read_rows(raw, fmt: str):
+    """
+    Построчно читает строки прогресса из бинарного файла raw.
+    Выдаёт (номер строки, словарь или None, если строку не удалось разобрать).
+    """
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip(): continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def export_rows(habits, habit_ids=None, start: date = None, end: date = None):
+    """Строки прогресса по привычкам (все или habit_ids) за дни start..end, по возрастанию даты."""
+    first = start.toordinal() if start else -math.inf
+    last = end.toordinal() if end else math.inf
+    for habit in habits:
+        if habit_ids is not None and habit.id not in habit_ids: continue
+        meta = {"habit_id": habit.id, "text": habit.text, "goal": habit.goal, "units": habit.units,
+                "color": habit.color, "icon": habit.icon}
+        for ordinal, value in habit.progress_log.ordinal_items():
+            if ordinal < first: continue
+            if ordinal > last: break
+            yield {**meta, "day": date.fromordinal(ordinal).isoformat(), "value": value}
+
+
+def export_progress(habits, path: str, fmt: str = None, habit_ids=None, start: date = None, end: date = None,
+                    on_progress=None) -> int:
+    """
+    Записывает прогресс в CSV или JSON Lines, не собирая файл в памяти.
+    on_progress(записано строк) вызывается после каждой привычки. Возвращает число строк.
+    """
+    fmt = fmt or detect_format(path)
+    written = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS) if fmt == "csv" else None
+        if writer: writer.writeheader()
+        for habit in habits:
+            if habit_ids is not None and habit.id not in habit_ids: continue
+            for row in export_rows([habit], None, start, end):
+                if writer:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                written += 1
+            if on_progress: on_progress(written)
+    os.replace(tmp_path, path)
+    return written
+
+
+def import_progress(habits, path: str, fmt: str = None, merge: str = "sum",
+                    batch_size: int = IMPORT_BATCH_SIZE, on_progress=None) -> ImportReport:
+    """
+    Потоково импортирует прогресс из CSV или JSON Lines в привычки habits.
+
+    Строка относится к привычке по habit_id, а без него — по названию (text).
+    Для неизвестной привычки создаётся новая (report.created); её поля
+    проверяются так же, как при загрузке данных (validate_habit_data). merge задаёт, что делать с днём,
+    за который прогресс уже есть: "sum" — сложить, "replace" — заменить.
+    Строки проверяются и применяются пачками по batch_size; после каждой пачки
+    вызывается on_progress(обработано строк, доля прочитанного файла). Если
+    файл перестаёт читаться (неверная кодировка, испорченный CSV), импорт
+    останавливается с ошибкой в отчёте, а прочитанное до неё сохраняется.
+    Сохранение в хранилище остаётся за вызывающим (DataManager.import_progress).
+    """
+    if merge not in MERGE_MODES:
+        raise ValueError(f"Неизвестный режим объединения: {merge}")
+    fmt = fmt or detect_format(path)
+    by_id = {habit.id: habit for habit in habits}
+    by_text = {}
+    for habit in habits:
+        by_text.setdefault(habit.text, habit)
+    report = ImportReport()
+    total_size = os.path.getsize(path) or 1
+
+    with open(path, "rb") as raw:
+        batch, line_no = [], 0
+        try:
+            for line_no, row in read_rows(raw, fmt):
+                batch.append((line_no, row))
+                if len(batch) >= batch_size:
+                    _apply_batch(batch, by_id, by_text, merge, report)
+                    batch = []
+                    if on_progress: on_progress(report.rows, min(raw.tell() / total_size, 1.0))
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Дальше файл не прочитать, но уже внесённые пачки остаются: их сохранит вызывающий
+            report.add_error(line_no + 1, f"файл не удалось дочитать: {e}")
+        if batch:
+            _apply_batch(batch, by_id, by_text, merge, report)
+        if on_progress: on_progress(report.rows, 1.0)
+    return report
+
+
+def _apply_batch(batch, by_id: dict, by_text: dict, merge: str, report: ImportReport):
+    entries = {}  # привычка -> [(день, значение)]
+    for line_no, row in batch:
+        report.rows += 1
+        if row is None:
+            report.add_error(line_no, "строку не удалось разобрать")
+            continue
+        try:
+            day = date.fromisoformat(str(row.get("day") or ""))
+            value = float(row.get("value"))
+        except (TypeError, ValueError):
+            report.add_error(line_no, f"неверная дата или значение: {row.get('day')!r}, {row.get('value')!r}")
+            continue
+        if not math.isfinite(value):
+            report.add_error(line_no, f"неверное значение: {row.get('value')!r}")
+            continue
+        habit = _find_or_create(row, by_id, by_text, report, line_no)
+        if habit is None: continue
+        entries.setdefault(habit, []).append((day, value))
+        report.imported += 1
+    for habit, values in entries.items():
+        habit.merge_progress(values, replace=merge == "replace")
+        report.touched.add(habit.id)
+
+
+def _find_or_create(row: dict, by_id: dict, by_text: dict, report: ImportReport,
+                    line_no: int) -> Habit | None:
+    habit_id, text = row.get("habit_id") or None, row.get("text") or None
+    habit = by_id.get(habit_id) if habit_id else by_text.get(text)
+    if habit is not None:
+        return habit
+    habit_data = {key: row.get(key) or None for key in ("text", "units", "color", "icon")}
+    try:
+        habit_data["goal"] = float(row.get("goal"))
+    except (TypeError, ValueError):
+        habit_data["goal"] = None
+    error = validate_habit_data({key: value for key, value in habit_data.items() if value is not None})
+    if error:
+        report.add_error(line_no, error)
+        return None
+    habit = Habit(habit_id=habit_id, **habit_data)
+    by_id[habit.id] = habit
+    by_text.setdefault(habit.text, habit)
+    report.created.append(habit)
+    return habit